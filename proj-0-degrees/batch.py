@@ -0,0 +1,105 @@
+import gc
+import json
+import multiprocessing
+import os
+import sys
+
+import degrees
+
+USAGE = ("Usage: python batch.py [--compact] [--workers N] "
+         "directory [pairs]")
+
+
+def main():
+    args = sys.argv[1:]
+    compact = "--compact" in args
+    if compact:
+        args.remove("--compact")
+    workers = os.cpu_count() or 1
+    if "--workers" in args:
+        i = args.index("--workers")
+        try:
+            workers = int(args[i + 1])
+        except (IndexError, ValueError):
+            sys.exit(USAGE)
+        del args[i:i + 2]
+    if len(args) not in [1, 2] or workers < 1:
+        sys.exit(USAGE)
+    directory = args[0]
+
+    # Loaded once here, workers share it instead of loading their own
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory, compact)
+    print("Data loaded.", file=sys.stderr)
+
+    pairs = open(args[1], encoding="utf-8") if len(args) == 2 else sys.stdin
+    with pairs:
+        for result in solve_all(pairs, workers, directory, compact):
+            print(json.dumps(result), flush=True)
+
+
+def solve_all(lines, workers, directory, compact=False):
+    """
+    Yields the result for every pair line, in input order.
+
+    With more than one worker the lines are spread over a process pool.
+    Forked workers inherit the loaded graph copy-on-write. Where fork
+    is not available each worker loads the data itself, which maps
+    the same pages when a snapshot exists.
+    """
+    if workers == 1:
+        for line in lines:
+            if line.strip():
+                yield solve(line)
+        return
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initializer, initargs = None, ()
+
+        # Keep the collector from touching (and so copying) shared objects
+        gc.freeze()
+    else:
+        context = multiprocessing.get_context()
+        initializer, initargs = degrees.load_data, (directory, compact)
+
+    with context.Pool(workers, initializer, initargs) as pool:
+        yield from pool.imap(
+            solve, (line for line in lines if line.strip()), chunksize=64
+        )
+
+
+def solve(line):
+    """
+    Answers one tab-separated "source<TAB>target" line, where each side
+    is an IMDB person id or an unambiguous name.
+    """
+    try:
+        source, target = line.rstrip("\n").split("\t")
+    except ValueError:
+        return {"line": line.rstrip("\n"), "error": "expected two fields"}
+
+    result = {"source": source, "target": target}
+    source_id = degrees.person_id_for_token(source)
+    target_id = degrees.person_id_for_token(target)
+    if source_id is None or target_id is None:
+        result["error"] = "person not found or ambiguous"
+        return result
+
+    path = degrees.shortest_path(source_id, target_id, method="bidirectional")
+    result["source_id"] = source_id
+    result["target_id"] = target_id
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            {"movie_id": movie_id, "person_id": person_id}
+            for movie_id, person_id in path
+        ]
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import random
+import sys
+import time
+
+import degrees
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+USAGE = ("Usage: python benchmark.py [--compact] [--method M] "
+         "[--queries N] [--seed S] directory")
+
+METHODS = ["bfs", "bidirectional", "astar", "cached"]
+
+
+def main():
+    args = sys.argv[1:]
+    compact = "--compact" in args
+    if compact:
+        args.remove("--compact")
+    options = {"--method": "bidirectional", "--queries": "1000",
+               "--seed": "0"}
+    for option in list(options):
+        if option in args:
+            i = args.index(option)
+            if i + 1 >= len(args):
+                sys.exit(USAGE)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) != 1 or options["--method"] not in METHODS:
+        sys.exit(USAGE)
+    try:
+        queries = int(options["--queries"])
+        seed = int(options["--seed"])
+    except ValueError:
+        sys.exit(USAGE)
+    if queries < 1:
+        sys.exit(USAGE)
+    method = options["--method"]
+
+    start = time.perf_counter()
+    degrees.load_data(args[0], compact)
+    report("load", f"{time.perf_counter() - start:.3f}s")
+    report("peak memory", peak_memory())
+
+    if method == "astar":
+        start = time.perf_counter()
+        degrees.build_landmarks()
+        report("landmarks", f"{time.perf_counter() - start:.3f}s")
+    elif method == "cached":
+        degrees.enable_tree_cache()
+
+    pairs = query_set(queries, seed)
+    sources = [source for source, _ in pairs]
+
+    start = time.perf_counter()
+    for person_id in sources:
+        degrees.neighbors_for_person(person_id)
+    elapsed = time.perf_counter() - start
+    report("neighbors", f"{elapsed / len(sources) * 1e6:.1f}us per person")
+
+    latencies = []
+    expanded = []
+    lengths = []
+    for source, target in pairs:
+        degrees.nodes_expanded = 0
+        start = time.perf_counter()
+        path = degrees.shortest_path(source, target, method=method)
+        latencies.append(time.perf_counter() - start)
+        expanded.append(degrees.nodes_expanded)
+        if path is not None:
+            lengths.append(len(path))
+
+    report("queries", f"{len(pairs)} ({method}), "
+                      f"{len(lengths)} connected")
+    if lengths:
+        report("mean degrees", f"{sum(lengths) / len(lengths):.2f}")
+    report("latency", ", ".join(
+        f"p{p} {percentile(latencies, p) * 1000:.3f}ms"
+        for p in [50, 90, 99]
+    ) + f", max {max(latencies) * 1000:.3f}ms")
+    report("nodes expanded", f"mean {sum(expanded) / len(expanded):.1f}, "
+                             f"p99 {percentile(expanded, 99)}")
+    report("peak memory", peak_memory())
+
+
+def query_set(count, seed):
+    """
+    Returns `count` (source, target) pairs of person ids drawn with a
+    fixed seed. People are picked by their position in people.csv, so
+    the same seed asks the same questions in every mode.
+    """
+    rng = random.Random(seed)
+    if degrees.graph is not None:
+        size = len(degrees.graph.person_ids)
+        person_id = degrees.person_id_for_key
+    else:
+        ids = list(degrees.people)
+        size = len(ids)
+        person_id = ids.__getitem__
+    return [
+        (person_id(rng.randrange(size)), person_id(rng.randrange(size)))
+        for _ in range(count)
+    ]
+
+
+def percentile(values, p):
+    """
+    Returns the `p`th percentile of a list of values.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, len(ordered) * p // 100)]
+
+
+def peak_memory():
+    """
+    Returns the peak resident memory of this process, if known.
+    """
+    if resource is None:
+        return "unknown"
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Kilobytes on Linux, bytes on macOS
+    if sys.platform != "darwin":
+        peak *= 1024
+    return f"{peak / 1024 / 1024:.1f}MB"
+
+
+def report(label, value):
+    print(f"{label + ':':<16}{value}")
+
+
+if __name__ == "__main__":
+    main()
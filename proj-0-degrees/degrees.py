@@ -1,7 +1,20 @@
 import csv
+import heapq
+import itertools
+import math
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+import paths
+import snapshot
+import treecache
+
+from graph import CompactGraph
+from landmarks import LandmarkOracle
+from namesearch import NameSearch, Postings
+from paths import ShortestPathDag, bidirectional_search, simple_paths
+from tables import NameIndex, StringTable
+from treecache import ParentTree, TreeCache
+from util import Node, DequeQueueFrontier, DisjointSet
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +25,57 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed graph, used instead of people and movies
+# when the data is loaded with compact=True
+graph = None
+
+# LandmarkOracle for distance bounds and A*, see build_landmarks
+landmarks = None
+
+# DisjointSet of person keys, one set per connected component
+components = None
+
+# TreeCache of BFS trees by source, see enable_tree_cache
+tree_cache = None
+
+# NameSearch prefix and trigram index over the keys of names
+name_search = None
+
+# People expanded by the searches so far, for benchmarks
+nodes_expanded = 0
 
-def load_data(directory):
+
+def load_data(directory, compact=False, use_snapshot=True):
     """
     Load data from CSV files into memory.
+
+    With `compact`, people and movies are kept in a CompactGraph
+    instead of the people and movies dictionaries.
+
+    If the directory has a snapshot newer than its CSV files (see
+    snapshot.py), it is memory-mapped instead and the data is compact.
     """
+    global graph, names, components, name_search
+
+    if use_snapshot and snapshot.is_fresh(directory):
+        loaded = snapshot.load(snapshot.path_for(directory))
+        if loaded is not None:
+            graph, names, components, name_search = loaded
+            return
+
+    if compact:
+        graph = CompactGraph.from_csv(directory)
+        names = NameIndex.build(graph.person_names, graph.person_ids)
+        build_components()
+
+        # Trigram postings packed as in a snapshot
+        trigram_keys, offsets, positions = \
+            NameSearch.build(names.keys).sections()
+        name_search = NameSearch(names.keys, Postings(
+            StringTable.build(trigram_keys), offsets, positions
+        ))
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -51,15 +110,189 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    build_components()
+    name_search = NameSearch.build(names)
+
+
+def build_components():
+    """
+    Labels the connected components of the loaded people,
+    joining everyone who starred in the same movie.
+    """
+    global components
+
+    if graph is not None:
+        components = DisjointSet(len(graph.person_ids))
+        all_movies = range(len(graph.movie_ids))
+    else:
+        components = DisjointSet()
+        for person_id in people:
+            components.add(person_id)
+        all_movies = movies
+
+    for movie in all_movies:
+        first = None
+        for star in star_keys(movie):
+            if first is None:
+                first = star
+            else:
+                components.union(first, star)
+
+
+def load_delta(directory):
+    """
+    Applies new people, movies and stars from the CSV files in
+    `directory` (any of them may be missing) to the loaded data.
+
+    Rows for people or movies that are already loaded are skipped,
+    as are stars of unknown people or movies.
+    """
+    try:
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if not person_loaded(row["id"]):
+                    add_person(row["id"], row["name"], row["birth"])
+    except FileNotFoundError:
+        pass
+
+    try:
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if not movie_loaded(row["id"]):
+                    add_movie(row["id"], row["title"], row["year"])
+    except FileNotFoundError:
+        pass
+
+    try:
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    add_star(row["person_id"], row["movie_id"])
+                except KeyError:
+                    pass
+    except FileNotFoundError:
+        pass
+
+
+def add_person(person_id, name, birth):
+    """
+    Adds a person to the loaded data, keeping the name index
+    and the derived indexes up to date.
+    """
+    if person_loaded(person_id):
+        raise Exception(f"person {person_id} is already loaded")
+
+    if graph is not None:
+        key = graph.add_person(person_id, name, birth)
+    else:
+        key = person_id
+        people[person_id] = {"name": name, "birth": birth, "movies": set()}
+
+    if isinstance(names, dict):
+        names.setdefault(name.lower(), set()).add(person_id)
+    else:
+        names.add(name.lower(), person_id)
+    name_search.add(name.lower())
+
+    components.add(key)
+    if landmarks is not None:
+        landmarks.add_person(
+            len(graph.person_ids) if graph is not None else None
+        )
+
+    # Cached trees are sized for the people known when they were built
+    if tree_cache is not None:
+        tree_cache.clear()
+
+
+def add_movie(movie_id, title, year):
+    """
+    Adds a movie, with no stars yet, to the loaded data.
+    """
+    if movie_loaded(movie_id):
+        raise Exception(f"movie {movie_id} is already loaded")
+
+    if graph is not None:
+        graph.add_movie(movie_id, title, year)
+    else:
+        movies[movie_id] = {"title": title, "year": year, "stars": set()}
+
+
+def add_star(person_id, movie_id):
+    """
+    Adds a person to the stars of a movie, keeping the derived
+    indexes up to date. Both must already be loaded.
+    """
+    if graph is not None:
+        person = graph.person_index[person_id]
+        movie = graph.movie_index[movie_id]
+        if not graph.add_star(person, movie):
+            return
+    else:
+        person, movie = person_id, movie_id
+        if movie_id in people[person_id]["movies"]:
+            return
+        movies[movie_id]["stars"].add(person_id)
+        people[person_id]["movies"].add(movie_id)
+
+    # Everyone else in the movie is now in the person's component
+    for star in star_keys(movie):
+        if star != person:
+            components.union(person, star)
+            break
+
+    if landmarks is not None:
+        landmarks.add_star(person, movie, movie_keys, star_keys)
+
+    # Cached trees may now miss shorter paths
+    if tree_cache is not None:
+        tree_cache.clear()
+
+
+def person_loaded(person_id):
+    """
+    Returns True if a person is in the loaded data.
+    """
+    if graph is not None:
+        return person_id in graph.person_index
+    return person_id in people
+
+
+def movie_loaded(movie_id):
+    """
+    Returns True if a movie is in the loaded data.
+    """
+    if graph is not None:
+        return movie_id in graph.movie_index
+    return movie_id in movies
+
+
+def connected(source, target):
+    """
+    Returns True if two people are in the same connected component.
+    """
+    return components.connected(person_key(source), person_key(target))
+
+
+def component_size(person_id):
+    """
+    Returns how many people are in the component of a person.
+    """
+    return components.component_size(person_key(person_id))
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    args = sys.argv[1:]
+    compact = "--compact" in args
+    if compact:
+        args.remove("--compact")
+    if len(args) > 1:
+        sys.exit("Usage: python degrees.py [--compact] [directory]")
+    directory = args[0] if len(args) == 1 else "large"
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, compact)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +302,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, method="bidirectional")
 
     if path is None:
         print("Not connected.")
@@ -78,22 +311,47 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_info(path[i][1])["name"]
+            person2 = person_info(path[i + 1][1])["name"]
+            movie = movie_info(path[i + 1][0])["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, method="bfs"):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `method` selects the search: "bfs" (one-sided breadth-first search),
+    "bidirectional" (breadth-first search from both ends), "astar"
+    (A* guided by landmark distances, see build_landmarks) or "cached"
+    (cached BFS trees, see enable_tree_cache).
+
     If no possible path, returns None.
     """
+    global nodes_expanded
+
+    if method not in ("bfs", "bidirectional", "astar", "cached"):
+        raise ValueError(f"unknown search method: {method}")
+
+    # Different components, nothing to search
+    if not connected(source, target):
+        return None
+
+    if method == "cached":
+        return cached_path(source, target)
+
+    if method == "astar":
+        return astar_path(source, target)
+
+    if graph is not None:
+        return compact_path(source, target, method)
+
+    if method == "bidirectional":
+        return bidirectional_path(source, target)
 
     # BFS - queue
-    frontier = QueueFrontier()
+    frontier = DequeQueueFrontier()
     explored = set()
 
     # Add first node
@@ -107,6 +365,7 @@ def shortest_path(source, target):
             return None
 
         node = frontier.remove()
+        nodes_expanded += 1
 
         # Found
         if node.state == target:
@@ -129,22 +388,264 @@ def shortest_path(source, target):
                 frontier.add(child)
 
 
+def bidirectional_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching from both ends.
 
+    Each side keeps its own BFS layer and the smaller one is expanded
+    a whole layer at a time, so the two searches meet in the middle.
 
+    If no possible path, returns None.
+    """
+    global nodes_expanded
+
+    expanded = paths.expanded
+    pairs = bidirectional_search(source, target, movie_keys, star_keys)
+    nodes_expanded += paths.expanded - expanded
+    return pairs
+
+
+def astar_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, using A* with the
+    landmark lower bound as heuristic.
+
+    If no possible path, returns None.
+    """
+    global nodes_expanded
+
+    if landmarks is None:
+        raise Exception("no landmarks, call build_landmarks first")
+
+    start = person_key(source)
+    goal = person_key(target)
+    estimate = landmarks.lower_bound(start, goal)
+    if estimate == math.inf:
+        return None
 
+    # person key -> (movie key, parent person key)
+    parents = {start: None}
+    cost = {start: 0}
+    closed = set()
+
+    # (f, -g, tie breaker, person key), deeper nodes first on equal f
+    counter = itertools.count()
+    frontier = [(estimate, 0, next(counter), start)]
+
+    while frontier:
+        _, _, _, person = heapq.heappop(frontier)
+        if person in closed:
+            continue
+
+        # Found
+        if person == goal:
+            pairs = []
+            while parents[person] is not None:
+                movie, parent = parents[person]
+                pairs.append(
+                    (movie_id_for_key(movie), person_id_for_key(person))
+                )
+                person = parent
+            pairs.reverse()
+            return pairs
+
+        closed.add(person)
+        nodes_expanded += 1
+        g = cost[person] + 1
+
+        # Add childs to frontier
+        for movie in movie_keys(person):
+            for star in star_keys(movie):
+                if star in closed or cost.get(star, math.inf) <= g:
+                    continue
+                estimate = landmarks.lower_bound(star, goal)
+                if estimate == math.inf:
+                    continue
+                cost[star] = g
+                parents[star] = (movie, person)
+                heapq.heappush(
+                    frontier, (g + estimate, -g, next(counter), star)
+                )
+
+    return None
+
+
+def enable_tree_cache(max_bytes=256 * 1024 * 1024):
+    """
+    Makes shortest_path(method="cached") answer from complete BFS
+    trees, cached by source person within `max_bytes`.
 
-def person_id_for_name(name):
+    A query from (or to) a cached person just walks the tree, any other
+    query builds and caches the tree of its source.
+    """
+    global tree_cache
+    tree_cache = TreeCache(max_bytes)
+
+
+def cached_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, from a cached BFS tree.
+
+    If no possible path, returns None.
+    """
+    global nodes_expanded
+
+    if tree_cache is None:
+        raise Exception("no tree cache, call enable_tree_cache first")
+
+    start = person_key(source)
+    goal = person_key(target)
+
+    tree = tree_cache.lookup(start, goal)
+    if tree is None:
+        expanded = treecache.expanded
+        size = len(graph.person_ids) if graph is not None else None
+        tree = ParentTree.build(start, movie_keys, star_keys, size=size)
+        tree_cache.put(tree)
+        nodes_expanded += treecache.expanded - expanded
+
+    if tree.source == start:
+        pairs = tree.path_to(goal)
+    else:
+        pairs = tree.path_from(start)
+    if pairs is None:
+        return None
+    return [(movie_id_for_key(movie), person_id_for_key(person))
+            for movie, person in pairs]
+
+
+def build_landmarks(count=16):
+    """
+    Precomputes distances from the `count` best connected people,
+    enabling distance_bounds and shortest_path(method="astar").
+    """
+    global landmarks
+
+    if graph is not None:
+        candidates = sorted(range(len(graph.person_ids)),
+                            key=graph.degree, reverse=True)
+        size = len(graph.person_ids)
+    else:
+        candidates = sorted(people, key=lambda person_id:
+                            len(people[person_id]["movies"]), reverse=True)
+        size = None
+
+    landmarks = LandmarkOracle.build(
+        candidates, movie_keys, star_keys, count=count, size=size
+    )
+
+
+def distance_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation
+    between two people, from the landmark distances.
+
+    Both bounds are math.inf if the people are not connected,
+    and the upper bound is math.inf if it is unknown.
+    """
+    if landmarks is None:
+        raise Exception("no landmarks, call build_landmarks first")
+    if source == target:
+        return 0, 0
+    return landmarks.bounds(person_key(source), person_key(target))
+
+
+def compact_path(source, target, method):
+    """
+    Runs shortest_path over the compact graph, converting
+    between IMDB ids and dense indices at the boundary.
+    """
+    global nodes_expanded
+
+    if method not in ("bfs", "bidirectional"):
+        raise ValueError(f"unknown search method: {method}")
+
+    expanded = graph.expanded
+    pairs = graph.shortest_path(
+        graph.person_index[source], graph.person_index[target],
+        bidirectional=method == "bidirectional"
+    )
+    nodes_expanded += graph.expanded - expanded
+    if pairs is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in pairs]
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs
+    that connect the source to the target.
+
+    The BFS runs once, when the first path is asked for, and paths are
+    then listed one at a time, so callers can stop after a few.
+    """
+    dag = shortest_path_dag(source, target)
+    if dag is None:
+        return
+    for pairs in dag.paths():
+        yield [(movie_id_for_key(movie), person_id_for_key(person))
+               for movie, person in pairs]
+
+
+def count_shortest_paths(source, target):
+    """
+    Returns the number of shortest paths between two people,
+    0 if they are not connected.
+    """
+    dag = shortest_path_dag(source, target)
+    return 0 if dag is None else dag.count()
+
+
+def shortest_path_dag(source, target):
+    """
+    Returns the ShortestPathDag between two people, or None.
+    """
+    if not connected(source, target):
+        return None
+    return ShortestPathDag.build(
+        person_key(source), person_key(target), movie_keys, star_keys
+    )
+
+
+def k_shortest_paths(source, target, k=None):
+    """
+    Yields up to `k` (all if None) simple lists of (movie_id, person_id)
+    pairs that connect the source to the target, shortest first.
+
+    Later paths may be longer than the shortest, giving near-shortest
+    alternatives. Each one costs a few searches, done only once asked for.
+    """
+    if not connected(source, target):
+        return
+    paths = simple_paths(
+        person_key(source), person_key(target), movie_keys, star_keys
+    )
+    for pairs in itertools.islice(paths, k):
+        yield [(movie_id_for_key(movie), person_id_for_key(person))
+               for movie, person in pairs]
+
+
+def person_id_for_name(name, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If not `interactive`, an ambiguous name returns None
+    instead of asking the user.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if not interactive:
+            return None
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_info(person_id)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -159,11 +660,50 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_id_for_token(token):
+    """
+    Returns the person_id for an IMDB id or a name that matches
+    exactly one person, without asking the user.
+    """
+    try:
+        person_info(token)
+        return token
+    except KeyError:
+        return person_id_for_name(token, interactive=False)
+
+
+def search_names(query, limit=10):
+    """
+    Returns up to `limit` person_ids for an autocomplete query:
+    people whose name starts with the query first, then people
+    with similar names (allowing for typos), best match first.
+    """
+    query = " ".join(query.lower().split())
+    if not query:
+        return []
+
+    matches = name_search.prefix(query, limit)
+    for name, _ in name_search.fuzzy(query, limit):
+        if name not in matches:
+            matches.append(name)
+
+    person_ids = []
+    for name in matches:
+        person_ids.extend(sorted(names.get(name, set())))
+    return person_ids[:limit]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in graph.neighbors(graph.person_index[person_id])
+        }
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -172,5 +712,71 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def person_info(person_id):
+    """
+    Returns the name and birth of a person.
+    """
+    if graph is not None:
+        i = graph.person_index[person_id]
+        return {"name": graph.person_names[i], "birth": graph.person_births[i]}
+    return people[person_id]
+
+
+def person_key(person_id):
+    """
+    Returns the key searches use for a person: its dense index
+    in the compact graph, or its IMDB id otherwise.
+    """
+    if graph is not None:
+        return graph.person_index[person_id]
+    return person_id
+
+
+def person_id_for_key(key):
+    """
+    Returns the IMDB id of a person key.
+    """
+    if graph is not None:
+        return graph.person_ids[key]
+    return key
+
+
+def movie_id_for_key(key):
+    """
+    Returns the IMDB id of a movie key.
+    """
+    if graph is not None:
+        return graph.movie_ids[key]
+    return key
+
+
+def movie_keys(key):
+    """
+    Returns the keys of the movies a person key starred in.
+    """
+    if graph is not None:
+        return graph.movies_of(key)
+    return people[key]["movies"]
+
+
+def star_keys(key):
+    """
+    Returns the keys of the people who starred in a movie key.
+    """
+    if graph is not None:
+        return graph.stars_of(key)
+    return movies[key]["stars"]
+
+
+def movie_info(movie_id):
+    """
+    Returns the title and year of a movie.
+    """
+    if graph is not None:
+        i = graph.movie_index[movie_id]
+        return {"title": graph.movie_titles[i], "year": graph.movie_years[i]}
+    return movies[movie_id]
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,268 @@
+import csv
+import itertools
+
+from array import array
+
+import paths
+
+from tables import SortedIndex, StringTable
+
+
+class CompactGraph():
+    """
+    Integer-indexed people/movies graph.
+
+    People and movies are mapped to dense integers. The person -> movie
+    and movie -> person adjacency lists are stored in CSR form: person `i`
+    starred in `person_movies[person_offsets[i]:person_offsets[i + 1]]`,
+    and movie `j` has `movie_people[movie_offsets[j]:movie_offsets[j + 1]]`
+    as its stars.
+
+    Ids, names, births, titles and years are StringTables of UTF-8
+    bytes, and ids are looked up by binary search over a sorted order
+    (see SortedIndex) rather than in dictionaries.
+
+    The CSR arrays are never modified. People, movies and credits added
+    later (see add_person, add_movie and add_star) go to small overlay
+    lists until the graph is compacted again.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 person_index=None, movie_index=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # Maps IMDB ids to dense indices
+        if person_index is None:
+            person_index = SortedIndex.build(person_ids)
+        if movie_index is None:
+            movie_index = SortedIndex.build(movie_ids)
+        self.person_index = person_index
+        self.movie_index = movie_index
+
+        # Overlay for additions: people and movies past the CSR arrays,
+        # and extra adjacency for any person or movie
+        self.csr_people = len(person_offsets) - 1
+        self.csr_movies = len(movie_offsets) - 1
+        self.extra_movies = {}
+        self.extra_stars = {}
+
+        # People expanded by searches so far
+        self.expanded = 0
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Build a compact graph from the people, movies and stars CSV files.
+        """
+        person_ids, person_names, person_births = [], [], []
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person_ids.append(row["id"])
+                person_names.append(row["name"])
+                person_births.append(row["birth"])
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                movie_ids.append(row["id"])
+                movie_titles.append(row["title"])
+                movie_years.append(row["year"])
+
+        # Only used while loading, the graph keeps sorted indices
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        # Edge list, skipping credits for unknown people or movies
+        edge_people = array("i")
+        edge_movies = array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    person = person_index[row["person_id"]]
+                    movie = movie_index[row["movie_id"]]
+                except KeyError:
+                    continue
+                edge_people.append(person)
+                edge_movies.append(movie)
+
+        person_offsets, person_movies = to_csr(
+            len(person_ids), edge_people, edge_movies
+        )
+        movie_offsets, movie_people = to_csr(
+            len(movie_ids), edge_movies, edge_people
+        )
+
+        del person_index, movie_index
+        return cls.from_lists(person_ids, person_names, person_births,
+                              movie_ids, movie_titles, movie_years,
+                              person_offsets, person_movies,
+                              movie_offsets, movie_people)
+
+    @classmethod
+    def from_lists(cls, person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   person_offsets, person_movies, movie_offsets,
+                   movie_people):
+        """
+        Build a compact graph from lists of strings, packed into tables.
+        """
+        return cls(
+            StringTable.build(person_ids), StringTable.build(person_names),
+            StringTable.build(person_births), StringTable.build(movie_ids),
+            StringTable.build(movie_titles), StringTable.build(movie_years),
+            person_offsets, person_movies, movie_offsets, movie_people
+        )
+
+    def movies_of(self, person):
+        """
+        Returns the movie indices a person index starred in.
+        """
+        movies = ()
+        if person < self.csr_people:
+            movies = memoryview(self.person_movies)[
+                self.person_offsets[person]:self.person_offsets[person + 1]
+            ]
+        if person in self.extra_movies:
+            movies = itertools.chain(movies, self.extra_movies[person])
+        return movies
+
+    def degree(self, person):
+        """
+        Returns the number of movies a person index starred in.
+        """
+        degree = len(self.extra_movies.get(person, ()))
+        if person < self.csr_people:
+            offsets = self.person_offsets
+            degree += offsets[person + 1] - offsets[person]
+        return degree
+
+    def stars_of(self, movie):
+        """
+        Returns the person indices who starred in a movie index.
+        """
+        stars = ()
+        if movie < self.csr_movies:
+            stars = memoryview(self.movie_people)[
+                self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+            ]
+        if movie in self.extra_stars:
+            stars = itertools.chain(stars, self.extra_stars[movie])
+        return stars
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) index pairs for people
+        who starred with a given person index.
+        """
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                yield movie, star
+
+    def shortest_path(self, source, target, bidirectional=True):
+        """
+        Returns the shortest list of (movie, person) index pairs
+        that connect the source index to the target index.
+
+        If no possible path, returns None.
+        """
+        expanded = paths.expanded
+        pairs = paths.bidirectional_search(
+            source, target, self.movies_of, self.stars_of,
+            bidirectional=bidirectional
+        )
+        self.expanded += paths.expanded - expanded
+        return pairs
+
+    def add_person(self, person_id, name, birth):
+        """
+        Adds a person to the overlay and returns its index.
+        """
+        person = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        self.person_index[person_id] = person
+        return person
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Adds a movie to the overlay and returns its index.
+        """
+        movie = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        self.movie_index[movie_id] = movie
+        return movie
+
+    def add_star(self, person, movie):
+        """
+        Adds a credit of a person index in a movie index to the overlay.
+        Returns False if the credit was already known.
+        """
+        if movie in self.movies_of(person):
+            return False
+        self.extra_movies.setdefault(person, []).append(movie)
+        self.extra_stars.setdefault(movie, []).append(person)
+        return True
+
+    def compacted(self):
+        """
+        Returns a graph with the overlay merged into new CSR arrays,
+        or this graph if nothing was added.
+        """
+        added = (len(self.person_ids) - self.csr_people
+                 + len(self.movie_ids) - self.csr_movies
+                 + len(self.extra_movies))
+        if not added:
+            return self
+
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person in range(len(self.person_ids)):
+            for movie in self.movies_of(person):
+                edge_people.append(person)
+                edge_movies.append(movie)
+
+        person_offsets, person_movies = to_csr(
+            len(self.person_ids), edge_people, edge_movies
+        )
+        movie_offsets, movie_people = to_csr(
+            len(self.movie_ids), edge_movies, edge_people
+        )
+        return CompactGraph.from_lists(
+            self.person_ids, self.person_names, self.person_births,
+            self.movie_ids, self.movie_titles, self.movie_years,
+            person_offsets, person_movies, movie_offsets, movie_people
+        )
+
+
+def to_csr(size, sources, targets):
+    """
+    Groups the `targets` of an edge list by their `sources`, which are
+    indices below `size`, and returns the CSR (offsets, indices) arrays.
+    """
+    offsets = array("i", bytes(4 * (size + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    indices = array("i", bytes(4 * len(targets)))
+    position = array("i", offsets)
+    for source, target in zip(sources, targets):
+        indices[position[source]] = target
+        position[source] += 1
+
+    return offsets, indices
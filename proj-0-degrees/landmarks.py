@@ -0,0 +1,154 @@
+import math
+
+from array import array
+
+
+class Distances(dict):
+    """
+    Distance table for people keyed by IMDB id, -1 when unreachable.
+    """
+
+    def __missing__(self, key):
+        return -1
+
+
+def distance_table(size=None):
+    """
+    Returns an empty distance table, an int16 array when people
+    are dense indices below `size`, else a Distances dictionary.
+    """
+    if size is None:
+        return Distances()
+    return array("h", [-1]) * size
+
+
+def distances_from(source, movies_of, stars_of, table):
+    """
+    Fills `table` with the degrees of separation of every person
+    reachable from `source` and returns it.
+
+    `movies_of(person)` and `stars_of(movie)` walk the people/movies
+    graph. Each movie's cast is scanned once, when it is first reached.
+    """
+    table[source] = 0
+    seen_movies = set()
+    layer = [source]
+    depth = 0
+
+    while layer:
+        depth += 1
+        next_layer = []
+        for person in layer:
+            for movie in movies_of(person):
+                if movie in seen_movies:
+                    continue
+                seen_movies.add(movie)
+                for star in stars_of(movie):
+                    if table[star] == -1:
+                        table[star] = depth
+                        next_layer.append(star)
+        layer = next_layer
+
+    return table
+
+
+class LandmarkOracle():
+    """
+    Degree-of-separation bounds from precomputed landmark distances.
+
+    For every landmark L the triangle inequality gives
+        |d(L, u) - d(L, v)| <= d(u, v) <= d(L, u) + d(L, v)
+    so a query costs one lookup per landmark.
+    """
+
+    def __init__(self, landmarks, tables):
+        self.landmarks = landmarks
+        self.tables = tables
+
+    @classmethod
+    def build(cls, candidates, movies_of, stars_of, count=16, size=None):
+        """
+        Runs a BFS from up to `count` landmarks.
+
+        `candidates` are person keys, best connected first. A candidate
+        that co-starred with an earlier landmark is skipped, since its
+        distances would add little over that landmark's.
+        """
+        landmarks = []
+        tables = []
+        for person in candidates:
+            if len(landmarks) == count:
+                break
+            if any(0 <= table[person] <= 1 for table in tables):
+                continue
+            landmarks.append(person)
+            tables.append(distances_from(
+                person, movies_of, stars_of, distance_table(size)
+            ))
+        return cls(landmarks, tables)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the distance between two people.
+
+        Both are math.inf when some landmark reaches exactly one of them,
+        as they are then not connected. The upper bound is math.inf when
+        no landmark reaches either of them.
+        """
+        lower = 0
+        upper = math.inf
+        for table in self.tables:
+            d_source = table[source]
+            d_target = table[target]
+            if d_source == -1 and d_target == -1:
+                continue
+            if d_source == -1 or d_target == -1:
+                return math.inf, math.inf
+            lower = max(lower, abs(d_source - d_target))
+            upper = min(upper, d_source + d_target)
+        return lower, upper
+
+    def lower_bound(self, source, target):
+        """
+        Returns an admissible and consistent A* heuristic: a lower bound
+        on the distance between two people.
+        """
+        return self.bounds(source, target)[0]
+
+    def add_person(self, size=None):
+        """
+        Makes room for a new person, now `size` people in total.
+        """
+        for table in self.tables:
+            if isinstance(table, array):
+                table.extend([-1] * (size - len(table)))
+
+    def add_star(self, person, movie, movies_of, stars_of):
+        """
+        Updates the distances after `person` was added to the cast of
+        `movie`. A new credit can only shorten distances, so only the
+        people it brings closer to a landmark are visited again.
+        """
+        for table in self.tables:
+            reached = [table[star] for star in stars_of(movie)
+                       if table[star] != -1]
+            if not reached:
+                continue
+
+            depth = min(reached) + 1
+            layer = [star for star in stars_of(movie)
+                     if table[star] == -1 or table[star] > depth]
+            for star in layer:
+                table[star] = depth
+
+            # Relax outwards while distances keep improving
+            while layer:
+                depth += 1
+                next_layer = []
+                for star in layer:
+                    for other_movie in movies_of(star):
+                        for other in stars_of(other_movie):
+                            if table[other] == -1 or table[other] > depth:
+                                table[other] = depth
+                                next_layer.append(other)
+                layer = next_layer
@@ -0,0 +1,149 @@
+import bisect
+import math
+
+from array import array
+from collections import Counter
+
+
+def trigrams(name):
+    """
+    Returns the set of trigrams of a lowercase name, padded so that
+    the start and end of the name count as well.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Postings():
+    """
+    Maps trigrams to arrays of name positions, stored as sorted
+    trigram keys with a CSR list of positions per trigram.
+    """
+
+    def __init__(self, keys, offsets, positions):
+        self.keys = keys
+        self.offsets = offsets
+        self.positions = positions
+
+    def get(self, trigram, default=None):
+        i = bisect.bisect_left(self.keys, trigram)
+        if i == len(self.keys) or self.keys[i] != trigram:
+            return default
+        return self.positions[self.offsets[i]:self.offsets[i + 1]]
+
+
+class NameSearch():
+    """
+    Prefix and typo-tolerant lookup over lowercase names.
+
+    `keys` is the sorted sequence of names, searched by binary search for
+    prefixes. `postings` maps each trigram to the positions in `keys` of
+    the names containing it. Names added later are kept in a small sorted
+    list with their own trigram sets.
+    """
+
+    def __init__(self, keys, postings):
+        self.keys = keys
+        self.postings = postings
+        self.added = []
+        self.added_trigrams = {}
+
+    @classmethod
+    def build(cls, names):
+        """
+        Indexes an iterable of lowercase names.
+        """
+        keys = sorted(set(names))
+        postings = {}
+        for position, name in enumerate(keys):
+            for trigram in trigrams(name):
+                postings.setdefault(trigram, array("i")).append(position)
+        return cls(keys, postings)
+
+    def add(self, name):
+        """
+        Indexes a lowercase name added after the index was built.
+        """
+        if name in self.added_trigrams or self.contains(name):
+            return
+        bisect.insort(self.added, name)
+        self.added_trigrams[name] = trigrams(name)
+
+    def contains(self, name):
+        i = bisect.bisect_left(self.keys, name)
+        return i < len(self.keys) and self.keys[i] == name
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` names starting with `prefix`,
+        in alphabetical order.
+        """
+        matches = []
+        for keys in (self.keys, self.added):
+            i = bisect.bisect_left(keys, prefix)
+            end = min(len(keys), i + limit)
+            while i < end and keys[i].startswith(prefix):
+                matches.append(keys[i])
+                i += 1
+        matches.sort()
+        return matches[:limit]
+
+    def fuzzy(self, query, limit=10, min_overlap=0.5, budget=5000,
+              shortlist=50):
+        """
+        Returns up to `limit` (name, score) pairs for names sharing at
+        least `min_overlap` of the query's trigrams, best first. The
+        score is the Dice coefficient of the two trigram sets.
+
+        Posting lists are read rarest first, since rare trigrams say the
+        most about a match, and reading stops once `budget` positions
+        were counted (or every list that a match must appear in was
+        read). Only the `shortlist` names sharing the most of those
+        trigrams are then scored, so common trigrams such as "an " are
+        never scanned in full.
+        """
+        wanted = trigrams(query)
+        needed = max(1, math.ceil(len(wanted) * min_overlap))
+
+        lists = sorted(
+            (self.postings.get(trigram, ()) for trigram in wanted), key=len
+        )
+
+        # A name sharing `needed` trigrams is in one of the rarest
+        # len(wanted) - needed + 1 lists
+        counts = Counter()
+        read = 0
+        for postings in lists[:len(wanted) - needed + 1]:
+            if read and read + len(postings) > budget:
+                break
+            counts.update(postings)
+            read += len(postings)
+
+        candidates = [self.keys[position]
+                      for position, _ in counts.most_common(shortlist)]
+        candidates.extend(self.added)
+
+        scored = []
+        for name in candidates:
+            name_trigrams = self.added_trigrams.get(name) or trigrams(name)
+            common = len(wanted & name_trigrams)
+            if common < needed:
+                continue
+            score = 2 * common / (len(wanted) + len(name_trigrams))
+            scored.append((-score, name))
+
+        scored.sort()
+        return [(name, -score) for score, name in scored[:limit]]
+
+    def sections(self):
+        """
+        Returns the postings of a built index as (trigram keys, offsets,
+        positions) for a Postings table.
+        """
+        trigram_keys = sorted(self.postings)
+        offsets = array("q", [0])
+        positions = array("i")
+        for trigram in trigram_keys:
+            positions.extend(self.postings[trigram])
+            offsets.append(len(positions))
+        return trigram_keys, offsets, positions
@@ -0,0 +1,305 @@
+import heapq
+import itertools
+
+# People expanded by bidirectional searches so far
+expanded = 0
+
+
+class Layers():
+    """
+    One side of a layered BFS. Every person reached maps to the movies
+    linking it to the previous layer, and each of those movies to its
+    cast members in that layer, so that every shortest walk back to
+    the root is kept, not only the first one found.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.depth = {root: 0}
+        self.movies = {}
+        self.parents = {}
+        self.layer = [root]
+
+    def expand(self, movies_of, stars_of):
+        """
+        Replaces the last layer with the next one.
+        """
+        d = self.depth[self.layer[0]]
+        next_layer = []
+        for person in self.layer:
+            for movie in movies_of(person):
+                if movie in self.parents:
+                    continue
+
+                # The cast of a movie first reached from layer d
+                # is in layer d or d + 1
+                cast = list(stars_of(movie))
+                self.parents[movie] = [star for star in cast
+                                       if self.depth.get(star) == d]
+                for star in cast:
+                    if star not in self.depth:
+                        self.depth[star] = d + 1
+                        next_layer.append(star)
+                    if self.depth[star] == d + 1:
+                        self.movies.setdefault(star, []).append(movie)
+        self.layer = next_layer
+
+    def steps(self, person):
+        """
+        Yields (movie, parent) for every edge back to the previous layer.
+        """
+        for movie in self.movies[person]:
+            for parent in self.parents[movie]:
+                yield movie, parent
+
+    def walks(self, person):
+        """
+        Yields every shortest walk from `person` back to the root,
+        as lists of (movie, next person) steps.
+        """
+        if person == self.root:
+            yield []
+            return
+
+        steps = []
+        stack = [self.steps(person)]
+        while stack:
+            step = next(stack[-1], None)
+            if step is None:
+                stack.pop()
+                if steps:
+                    steps.pop()
+                continue
+
+            steps.append(step)
+            if step[1] == self.root:
+                yield list(steps)
+                steps.pop()
+            else:
+                stack.append(self.steps(step[1]))
+
+    def counts(self, people):
+        """
+        Returns the number of shortest walks back to the root from
+        each of `people` (and from everyone between them and the root).
+        """
+        counts = {self.root: 1}
+        order = [person for person in people if person != self.root]
+        seen = set(order)
+
+        # Each step is one layer closer to the root, so reversed
+        # order counts every parent before its children
+        for person in order:
+            for _, parent in self.steps(person):
+                if parent not in seen and parent != self.root:
+                    seen.add(parent)
+                    order.append(parent)
+        for person in reversed(order):
+            counts[person] = sum(counts[parent]
+                                 for _, parent in self.steps(person))
+        return counts
+
+
+class ShortestPathDag():
+    """
+    Every shortest path between two people, as a layered DAG grown
+    from both ends until the two sides meet.
+
+    Every shortest path crosses the layer where they met at exactly one
+    person, so the paths are those through each meeting person, joining
+    any walk from it back to the source with any walk on to the target.
+    The number of paths can grow exponentially while the DAG stays the
+    size of a bidirectional BFS.
+    """
+
+    def __init__(self, forward, backward, meeting):
+        self.forward = forward
+        self.backward = backward
+        self.meeting = meeting
+
+    @classmethod
+    def build(cls, source, target, movies_of, stars_of):
+        """
+        Grows the smaller side a layer at a time until the sides meet.
+
+        Returns None if `target` cannot be reached.
+        """
+        forward = Layers(source)
+        backward = Layers(target)
+        if source == target:
+            return cls(forward, backward, [source])
+
+        while forward.layer and backward.layer:
+            if len(forward.layer) <= len(backward.layer):
+                side, other = forward, backward
+            else:
+                side, other = backward, forward
+            side.expand(movies_of, stars_of)
+
+            # Meetings can only be with the other side's last layer
+            meeting = [person for person in side.layer
+                       if person in other.depth]
+            if meeting:
+                return cls(forward, backward, meeting)
+
+        return None
+
+    def paths(self):
+        """
+        Yields every shortest path as a list of (movie, person) pairs,
+        one at a time.
+        """
+        for person in self.meeting:
+            for walk in self.forward.walks(person):
+
+                # Turn the walk back to the source into pairs from it
+                people = [person] + [parent for _, parent in walk]
+                head = [(movie, people[i])
+                        for i, (movie, _) in enumerate(walk)]
+                head.reverse()
+
+                for tail in self.backward.walks(person):
+                    yield head + tail
+
+    def count(self):
+        """
+        Returns the number of shortest paths, without listing them.
+        """
+        forward = self.forward.counts(self.meeting)
+        backward = self.backward.counts(self.meeting)
+        return sum(forward[person] * backward[person]
+                   for person in self.meeting)
+
+
+def bidirectional_search(source, target, movies_of, stars_of,
+                         banned_people=(), banned_steps=(),
+                         bidirectional=True):
+    """
+    Returns the shortest list of (movie, person) pairs from `source` to
+    `target` that avoids `banned_people` and does not start with any of
+    the (movie, person) `banned_steps`, or None.
+
+    Searches from both ends, a whole layer of the smaller side at a time,
+    or only from the source if not `bidirectional`. Without banned steps
+    a movie's cast is scanned at most once per side, since every later
+    visit could only reach people that were already found.
+    """
+    global expanded
+
+    if source == target:
+        return []
+
+    # person -> (movie, next person towards that side's root)
+    forward = {source: None}
+    backward = {target: None}
+    forward_movies = set()
+    backward_movies = set()
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+        if not bidirectional or len(forward_layer) <= len(backward_layer):
+            layer, parents, seen = forward_layer, forward, forward_movies
+            other = backward
+        else:
+            layer, parents, seen = backward_layer, backward, backward_movies
+            other = forward
+
+        next_layer = []
+        expanded += len(layer)
+        for person in layer:
+            for movie in movies_of(person):
+                if movie in seen:
+                    continue
+                if not banned_steps:
+                    seen.add(movie)
+
+                for star in stars_of(movie):
+                    if star in parents or star in banned_people:
+                        continue
+                    if banned_steps and (
+                        person == source and (movie, star) in banned_steps
+                        or star == source and (movie, person) in banned_steps
+                    ):
+                        continue
+                    parents[star] = (movie, person)
+                    next_layer.append(star)
+
+                    # Every meeting in this layer is as short as the first
+                    if star in other:
+                        return join(forward, backward, star)
+
+        if layer is forward_layer:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+    return None
+
+
+def join(forward, backward, meeting):
+    """
+    Joins the parent maps of a search from both ends at the
+    `meeting` person into (movie, person) pairs.
+    """
+    pairs = []
+    person = meeting
+    while forward[person] is not None:
+        movie, parent = forward[person]
+        pairs.append((movie, person))
+        person = parent
+    pairs.reverse()
+
+    person = meeting
+    while backward[person] is not None:
+        movie, child = backward[person]
+        pairs.append((movie, child))
+        person = child
+    return pairs
+
+
+def simple_paths(source, target, movies_of, stars_of):
+    """
+    Yields simple paths from `source` to `target` as lists of
+    (movie, person) pairs, shortest first (Yen's algorithm).
+
+    Each path found is branched at every person on it: the rest of the
+    path is searched again with the steps that earlier paths took from
+    that person banned. Branches wait in a heap until they are the
+    shortest left, so stopping early skips the remaining work.
+    """
+    path = bidirectional_search(source, target, movies_of, stars_of)
+    if path is None:
+        return
+
+    found = []
+    seen = {tuple(path)}
+    candidates = []
+    counter = itertools.count()
+
+    while True:
+        yield list(path)
+        found.append(path)
+
+        people = [source] + [person for _, person in path]
+        for i in range(len(path)):
+            root = path[:i]
+            banned_steps = {other[i] for other in found
+                            if len(other) > i and other[:i] == root}
+            spur = bidirectional_search(
+                people[i], target, movies_of, stars_of,
+                banned_people=set(people[:i]), banned_steps=banned_steps
+            )
+            if spur is None:
+                continue
+            candidate = tuple(root + spur)
+            if candidate in seen:
+                continue
+            seen.add(candidate)
+            heapq.heappush(
+                candidates, (len(candidate), next(counter), candidate)
+            )
+
+        if not candidates:
+            return
+        path = list(heapq.heappop(candidates)[2])
@@ -0,0 +1,270 @@
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+
+USAGE = ("Usage: python server.py [--compact] [--port N | --socket PATH] "
+         "[--landmarks N] [--tree-cache MB] directory")
+
+METHODS = ["bfs", "bidirectional", "astar", "cached"]
+
+
+class Latencies():
+    """
+    Thread-safe request counter and latency record per endpoint.
+    """
+
+    def __init__(self, keep=10000):
+        self.keep = keep
+        self.samples = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def add(self, endpoint, seconds):
+        with self.lock:
+            samples = self.samples.setdefault(endpoint, [])
+            samples.append(seconds)
+            if len(samples) > self.keep:
+                del samples[:len(samples) - self.keep]
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def summary(self):
+        """
+        Returns the request count and latency percentiles (in
+        milliseconds, over the latest requests) of every endpoint.
+        """
+        with self.lock:
+            summary = {}
+            for endpoint, samples in self.samples.items():
+                ordered = sorted(samples)
+                summary[endpoint] = {"requests": self.counts[endpoint]}
+                for p in [50, 90, 99]:
+                    i = min(len(ordered) - 1, len(ordered) * p // 100)
+                    summary[endpoint][f"p{p}_ms"] = ordered[i] * 1000
+            return summary
+
+
+latencies = Latencies()
+started = time.time()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Answers JSON requests:
+        GET /path?source=...&target=...[&method=...]
+        GET /person?name=...
+        GET /search?q=...[&limit=...]
+        GET /stats
+    where source and target are IMDB person ids or names.
+    """
+
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        try:
+            if url.path == "/path":
+                status, body = find_path(query)
+            elif url.path == "/person":
+                status, body = find_person(query)
+            elif url.path == "/search":
+                status, body = search(query)
+            elif url.path == "/stats":
+                status, body = 200, stats()
+            else:
+                status, body = 404, {"error": "not found"}
+        except Exception as e:
+            status, body = 500, {"error": str(e)}
+
+        elapsed = time.perf_counter() - start
+        latencies.add(url.path, elapsed)
+        body["latency_ms"] = elapsed * 1000
+
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-Response-Time", f"{elapsed * 1000:.3f}ms")
+        self.end_headers()
+        self.wfile.write(data)
+        self.log_message('"%s" %d %.3fms', self.requestline, status,
+                         elapsed * 1000)
+
+    def log_request(self, code="-", size="-"):
+        # Logged with the latency at the end of do_GET instead
+        pass
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "local"
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn,
+                     socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+def main():
+    args = sys.argv[1:]
+    compact = "--compact" in args
+    if compact:
+        args.remove("--compact")
+    options = {"--port": "8000", "--socket": None,
+               "--landmarks": None, "--tree-cache": None}
+    for option in list(options):
+        if option in args:
+            i = args.index(option)
+            if i + 1 >= len(args):
+                sys.exit(USAGE)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) != 1:
+        sys.exit(USAGE)
+    directory = args[0]
+
+    print("Loading data...")
+    degrees.load_data(directory, compact)
+    if options["--landmarks"] is not None:
+        degrees.build_landmarks(int(options["--landmarks"]))
+    if options["--tree-cache"] is not None:
+        degrees.enable_tree_cache(
+            int(float(options["--tree-cache"]) * 1024 * 1024)
+        )
+    print("Data loaded.")
+
+    if options["--socket"] is not None:
+        path = options["--socket"]
+        if os.path.exists(path):
+            os.remove(path)
+        server = UnixHTTPServer(path, Handler)
+        print(f"Serving on {path}")
+    else:
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", int(options["--port"])), Handler
+        )
+        print(f"Serving on http://127.0.0.1:{server.server_address[1]}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def find_path(query):
+    """
+    Returns (status, body) for a shortest path request.
+    """
+    default = "cached" if degrees.tree_cache is not None else "bidirectional"
+    method = query.get("method", default)
+    if method not in METHODS:
+        return 400, {"error": f"method must be one of {METHODS}"}
+    if method == "astar" and degrees.landmarks is None:
+        return 400, {"error": "astar needs the server started with "
+                              "--landmarks"}
+    if method == "cached" and degrees.tree_cache is None:
+        return 400, {"error": "cached needs the server started with "
+                              "--tree-cache"}
+    if "source" not in query or "target" not in query:
+        return 400, {"error": "source and target are required"}
+
+    source = degrees.person_id_for_token(query["source"])
+    target = degrees.person_id_for_token(query["target"])
+    for field, person_id in [("source", source), ("target", target)]:
+        if person_id is None:
+            return 404, {
+                "error": f"{field} not found or ambiguous",
+                "candidates": candidates(query[field]),
+            }
+
+    path = degrees.shortest_path(source, target, method=method)
+    body = {"source": source, "target": target, "method": method}
+    if path is None:
+        body["degrees"] = None
+        body["path"] = None
+        return 200, body
+
+    body["degrees"] = len(path)
+    body["path"] = [{
+        "movie_id": movie_id,
+        "title": degrees.movie_info(movie_id)["title"],
+        "person_id": person_id,
+        "name": degrees.person_info(person_id)["name"],
+    } for movie_id, person_id in path]
+    return 200, body
+
+
+def find_person(query):
+    """
+    Returns (status, body) for a name lookup.
+    """
+    if "name" not in query:
+        return 400, {"error": "name is required"}
+    return 200, {
+        "name": query["name"],
+        "person_id": degrees.person_id_for_name(
+            query["name"], interactive=False
+        ),
+        "candidates": candidates(query["name"]),
+    }
+
+
+def search(query):
+    """
+    Returns (status, body) for an autocomplete query.
+    """
+    if "q" not in query:
+        return 400, {"error": "q is required"}
+    try:
+        limit = int(query.get("limit", 10))
+    except ValueError:
+        return 400, {"error": "limit must be a number"}
+
+    people = []
+    for person_id in degrees.search_names(query["q"], limit):
+        person = degrees.person_info(person_id)
+        people.append({"id": person_id, "name": person["name"],
+                       "birth": person["birth"]})
+    return 200, {"q": query["q"], "people": people}
+
+
+def candidates(name):
+    """
+    Returns every person with a name, to disambiguate it.
+    """
+    people = []
+    for person_id in sorted(degrees.names.get(name.lower(), set())):
+        person = degrees.person_info(person_id)
+        people.append({"id": person_id, "name": person["name"],
+                       "birth": person["birth"]})
+    return people
+
+
+def stats():
+    """
+    Returns server statistics.
+    """
+    body = {
+        "uptime_s": time.time() - started,
+        "endpoints": latencies.summary(),
+    }
+    if degrees.tree_cache is not None:
+        body["tree_cache"] = degrees.tree_cache.stats()
+    return body
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import mmap
+import os
+import struct
+import sys
+
+from array import array
+
+from graph import CompactGraph
+from namesearch import NameSearch, Postings
+from tables import NameIndex, SortedIndex, StringTable, string_table
+from util import DisjointSet
+
+MAGIC = b"DEGREES\0"
+VERSION = 3
+
+# Reads back differently on a machine with the other byte order
+BYTE_ORDER_MARK = 0x01020304
+
+FILENAME = "degrees.snapshot"
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Sections in file order, with the array type code of each one
+# (None for raw UTF-8 bytes of a string table)
+SECTIONS = [
+    ("person_offsets", "i"),
+    ("person_movies", "i"),
+    ("movie_offsets", "i"),
+    ("movie_people", "i"),
+    ("person_ids.offsets", "q"),
+    ("person_ids.data", None),
+    ("person_names.offsets", "q"),
+    ("person_names.data", None),
+    ("person_births.offsets", "q"),
+    ("person_births.data", None),
+    ("movie_ids.offsets", "q"),
+    ("movie_ids.data", None),
+    ("movie_titles.offsets", "q"),
+    ("movie_titles.data", None),
+    ("movie_years.offsets", "q"),
+    ("movie_years.data", None),
+    ("person_order", "i"),
+    ("movie_order", "i"),
+    ("name_keys.offsets", "q"),
+    ("name_keys.data", None),
+    ("name_offsets", "i"),
+    ("name_people", "i"),
+    ("component_parent", "i"),
+    ("component_size", "i"),
+    ("trigram_keys.offsets", "q"),
+    ("trigram_keys.data", None),
+    ("trigram_offsets", "q"),
+    ("trigram_positions", "i"),
+]
+
+# magic, version, byte order mark, section count
+HEADER = struct.Struct("=8sIII")
+
+# offset and length of one section
+ENTRY = struct.Struct("=QQ")
+
+
+def path_for(directory):
+    """
+    Returns the snapshot path for a data directory.
+    """
+    return os.path.join(directory, FILENAME)
+
+
+def is_fresh(directory):
+    """
+    Returns True if the directory has a snapshot newer than its CSV files.
+    """
+    try:
+        built = os.path.getmtime(path_for(directory))
+    except OSError:
+        return False
+    for source in SOURCES:
+        try:
+            if os.path.getmtime(os.path.join(directory, source)) > built:
+                return False
+        except OSError:
+            pass
+    return True
+
+
+def save(graph, names, components, path):
+    """
+    Writes a compact graph, its name index and its connected
+    components to a snapshot file.
+    """
+    graph = graph.compacted()
+    sections = {
+        "person_offsets": graph.person_offsets,
+        "person_movies": graph.person_movies,
+        "movie_offsets": graph.movie_offsets,
+        "movie_people": graph.movie_people,
+    }
+    for field in ["person_ids", "person_names", "person_births",
+                  "movie_ids", "movie_titles", "movie_years"]:
+        offsets, data = string_table(getattr(graph, field))
+        sections[f"{field}.offsets"] = offsets
+        sections[f"{field}.data"] = data
+
+    # Sorted permutations replace the id -> index dictionaries
+    person_ids = list(graph.person_ids)
+    movie_ids = list(graph.movie_ids)
+    sections["person_order"] = array(
+        "i", sorted(range(len(person_ids)), key=person_ids.__getitem__)
+    )
+    sections["movie_order"] = array(
+        "i", sorted(range(len(movie_ids)), key=movie_ids.__getitem__)
+    )
+
+    # Name index, sorted by lowercase name
+    person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+    keys = sorted(name for name, _ in names.items())
+    name_offsets = array("i", [0])
+    name_people = array("i")
+    for key in keys:
+        name_people.extend(sorted(
+            person_index[person_id] for person_id in names[key]
+        ))
+        name_offsets.append(len(name_people))
+    sections["name_keys.offsets"], sections["name_keys.data"] = \
+        string_table(keys)
+    sections["name_offsets"] = name_offsets
+    sections["name_people"] = name_people
+
+    # Trigram postings refer to positions in the sorted name keys
+    trigram_keys, trigram_offsets, trigram_positions = \
+        NameSearch.build(keys).sections()
+    sections["trigram_keys.offsets"], sections["trigram_keys.data"] = \
+        string_table(trigram_keys)
+    sections["trigram_offsets"] = trigram_offsets
+    sections["trigram_positions"] = trigram_positions
+
+    # Flattened union-find, so every person points at its root
+    sections["component_parent"] = array(
+        "i", (components.find(i) for i in range(len(person_ids)))
+    )
+    sections["component_size"] = components.size
+
+    # Lay sections out after the header, aligned to 8 bytes
+    position = HEADER.size + ENTRY.size * len(SECTIONS)
+    entries = []
+    blobs = []
+    for name, _ in SECTIONS:
+        blob = bytes(sections[name])
+        position += -position % 8
+        entries.append((position, len(blob)))
+        blobs.append(blob)
+        position += len(blob)
+
+    # Write to a temporary file first so readers never see half a snapshot
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER_MARK, len(SECTIONS)))
+        for entry in entries:
+            f.write(ENTRY.pack(*entry))
+        for (offset, _), blob in zip(entries, blobs):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(blob)
+    os.replace(temporary, path)
+
+
+def load(path):
+    """
+    Memory-maps a snapshot file.
+
+    Returns a (graph, names, components, name_search) tuple whose arrays
+    are views into the map, or None if the file is not a snapshot of
+    this version.
+    The components are copied, since union-find writes to its arrays.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+    magic, version, mark, count = HEADER.unpack_from(view)
+    if (magic != MAGIC or version != VERSION or mark != BYTE_ORDER_MARK
+            or count != len(SECTIONS)):
+        view.release()
+        mapped.close()
+        return None
+
+    sections = {}
+    for k, (name, code) in enumerate(SECTIONS):
+        offset, length = ENTRY.unpack_from(view, HEADER.size + ENTRY.size * k)
+        section = view[offset:offset + length]
+        sections[name] = section.cast(code) if code else section
+
+    def strings(field):
+        return StringTable(sections[f"{field}.offsets"],
+                           sections[f"{field}.data"])
+
+    person_ids = strings("person_ids")
+    movie_ids = strings("movie_ids")
+
+    graph = CompactGraph(
+        person_ids, strings("person_names"), strings("person_births"),
+        movie_ids, strings("movie_titles"), strings("movie_years"),
+        sections["person_offsets"], sections["person_movies"],
+        sections["movie_offsets"], sections["movie_people"],
+        person_index=SortedIndex(person_ids, sections["person_order"]),
+        movie_index=SortedIndex(movie_ids, sections["movie_order"]),
+    )
+    names = NameIndex(strings("name_keys"), sections["name_offsets"],
+                      sections["name_people"], person_ids)
+    components = DisjointSet.from_arrays(sections["component_parent"],
+                                         sections["component_size"])
+    name_search = NameSearch(names.keys, Postings(
+        strings("trigram_keys"), sections["trigram_offsets"],
+        sections["trigram_positions"]
+    ))
+    return graph, names, components, name_search
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python snapshot.py [directory]")
+    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+
+    # Imported here so degrees can import this module
+    import degrees
+
+    print("Loading data...")
+    degrees.load_data(directory, compact=True, use_snapshot=False)
+    print("Data loaded.")
+
+    path = path_for(directory)
+    save(degrees.graph, degrees.names, degrees.components, path)
+    print(f"Snapshot written to {path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import csv
+import itertools
+import os
+import random
+import sys
+
+USAGE = "Usage: python synthetic.py directory credits [seed]"
+
+SYLLABLES = ["al", "an", "ar", "be", "bi", "ca", "da", "de", "el", "en",
+             "fa", "ga", "ha", "in", "is", "ja", "ka", "la", "le", "li",
+             "ma", "mi", "na", "ne", "o", "pa", "ra", "re", "ri", "sa",
+             "se", "ta", "te", "th", "to", "va", "ve", "wi", "ya", "zo"]
+ENDINGS = ["", "", "n", "s", "r", "l", "son", "man", "ez", "ski", "ton"]
+
+WORDS = ["Night", "Day", "Last", "First", "Dark", "Lost", "Long", "Red",
+         "City", "River", "Road", "Game", "Story", "House", "Heart", "War",
+         "Summer", "Winter", "King", "Queen", "Man", "Woman", "Dream", "Star"]
+
+# Average credits per person, the smallest cast, and the power-law
+# exponents of cast sizes and of how many movies each person is in
+CREDITS_PER_PERSON = 4
+MIN_CAST = 2
+CAST_EXPONENT = 1.8
+POPULARITY_EXPONENT = 0.6
+MAX_CAST = 300
+
+
+def main():
+    if len(sys.argv) not in [3, 4]:
+        sys.exit(USAGE)
+    directory = sys.argv[1]
+    try:
+        credits = int(sys.argv[2])
+        seed = int(sys.argv[3]) if len(sys.argv) == 4 else 0
+    except ValueError:
+        sys.exit(USAGE)
+
+    people, movies, stars = generate(directory, credits, seed)
+    print(f"Wrote {people} people, {movies} movies and {stars} credits "
+          f"to {directory}.")
+
+
+def generate(directory, credits, seed=0):
+    """
+    Writes people.csv, movies.csv and stars.csv with about `credits`
+    credits to `directory`, and returns the number of rows of each.
+
+    Cast sizes follow a power law (many small casts, a few huge ones)
+    and so does popularity: people are drawn with Zipf-like weights,
+    so a few of them appear in a large share of the movies.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    people = max(2, credits // CREDITS_PER_PERSON)
+
+    # Zipf-like popularity over people in random order
+    order = list(range(1, people + 1))
+    rng.shuffle(order)
+    cumulative = list(itertools.accumulate(
+        1 / rank ** POPULARITY_EXPONENT for rank in range(1, people + 1)
+    ))
+
+    with open(f"{directory}/people.csv", "w", newline="",
+              encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        f.write("id,name,birth\n")
+        for person_id in range(1, people + 1):
+            writer.writerow([person_id, name(rng), rng.randint(1900, 2010)])
+
+    stars = 0
+    movies = 0
+    with open(f"{directory}/movies.csv", "w", newline="",
+              encoding="utf-8") as movies_file, \
+            open(f"{directory}/stars.csv", "w", newline="",
+                 encoding="utf-8") as stars_file:
+        movie_writer = csv.writer(movies_file, quoting=csv.QUOTE_NONNUMERIC)
+        star_writer = csv.writer(stars_file)
+        movies_file.write("id,title,year\n")
+        stars_file.write("person_id,movie_id\n")
+
+        while stars < credits:
+            movies += 1
+            year = rng.randint(1920, 2024)
+            movie_writer.writerow([movies, title(rng), year])
+
+            size = min(MAX_CAST, credits - stars,
+                       int(MIN_CAST * rng.paretovariate(CAST_EXPONENT)))
+            cast = set(order[i] for i in rng.choices(
+                range(people), cum_weights=cumulative, k=size
+            ))
+            for person_id in cast:
+                star_writer.writerow([person_id, movies])
+            stars += len(cast)
+
+    return people, movies, stars
+
+
+def name(rng):
+    """
+    Returns a random, pronounceable person name.
+    """
+    first = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 3)))
+    last = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+    return f"{first.title()} {last.title()}{rng.choice(ENDINGS)}"
+
+
+def title(rng):
+    """
+    Returns a random movie title.
+    """
+    return " ".join(rng.choices(WORDS, k=rng.randint(1, 4)))
+
+
+if __name__ == "__main__":
+    main()
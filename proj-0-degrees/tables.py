@@ -0,0 +1,193 @@
+import bisect
+
+from array import array
+
+
+class StringTable():
+    """
+    Sequence of strings stored as UTF-8 bytes plus offsets.
+    Strings appended later are kept in a list.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+        self.stored = len(offsets) - 1
+        self.appended = []
+
+    @classmethod
+    def build(cls, strings):
+        """
+        Returns the table of an iterable of strings, with 32-bit offsets
+        since it is only kept in memory.
+        """
+        return cls(*string_table(strings, "i"))
+
+    def __len__(self):
+        return self.stored + len(self.appended)
+
+    def __getitem__(self, i):
+        if i >= self.stored:
+            return self.appended[i - self.stored]
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def append(self, string):
+        self.appended.append(string)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SortedView():
+    """
+    Sequence of `strings` in the order given by `order`, for bisect.
+    """
+
+    def __init__(self, strings, order):
+        self.strings = strings
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.strings[self.order[i]]
+
+
+class SortedIndex():
+    """
+    Maps strings to their position in a string table by binary search
+    over a sorted permutation, so no dictionary has to be built.
+    Keys added later are kept in a dictionary.
+    """
+
+    def __init__(self, strings, order):
+        self.order = order
+        self.sorted = SortedView(strings, order)
+        self.added = {}
+
+    @classmethod
+    def build(cls, strings):
+        """
+        Returns the index of a sequence of strings.
+        """
+        order = sorted(range(len(strings)), key=strings.__getitem__)
+        return cls(strings, array("i", order))
+
+    def __getitem__(self, key):
+        if key in self.added:
+            return self.added[key]
+        i = bisect.bisect_left(self.sorted, key)
+        if i == len(self.sorted) or self.sorted[i] != key:
+            raise KeyError(key)
+        return self.order[i]
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __setitem__(self, key, value):
+        self.added[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class NameIndex():
+    """
+    Maps lowercase names to sets of person_ids, stored as sorted keys
+    with a CSR list of person indices per key. Names added later are
+    kept in a dictionary.
+    """
+
+    def __init__(self, keys, offsets, people, person_ids):
+        self.keys = keys
+        self.offsets = offsets
+        self.people = people
+        self.person_ids = person_ids
+        self.added = {}
+
+    @classmethod
+    def build(cls, names, person_ids):
+        """
+        Returns the index of a sequence of names, where the person at
+        position i of `names` has the id at position i of `person_ids`.
+        """
+        lowered = [name.lower() for name in names]
+        keys = []
+        offsets = array("i", [0])
+        people = array("i")
+        for i in sorted(range(len(lowered)), key=lowered.__getitem__):
+            if keys and keys[-1] != lowered[i]:
+                offsets.append(len(people))
+            if not keys or keys[-1] != lowered[i]:
+                keys.append(lowered[i])
+            people.append(i)
+        if keys:
+            offsets.append(len(people))
+        return cls(StringTable.build(keys), offsets, people, person_ids)
+
+    def position(self, name):
+        """
+        Returns the position of `name` in the sorted keys, or None.
+        """
+        i = bisect.bisect_left(self.keys, name)
+        if i < len(self.keys) and self.keys[i] == name:
+            return i
+        return None
+
+    def person_ids_at(self, i):
+        return {
+            self.person_ids[self.people[k]]
+            for k in range(self.offsets[i], self.offsets[i + 1])
+        }
+
+    def get(self, name, default=None):
+        i = self.position(name)
+        if i is None and name not in self.added:
+            return default
+        person_ids = set() if i is None else self.person_ids_at(i)
+        return person_ids | self.added.get(name, set())
+
+    def __contains__(self, name):
+        return name in self.added or self.position(name) is not None
+
+    def __getitem__(self, name):
+        person_ids = self.get(name)
+        if person_ids is None:
+            raise KeyError(name)
+        return person_ids
+
+    def __len__(self):
+        return len(self.keys) + sum(
+            1 for name in self.added if self.position(name) is None
+        )
+
+    def add(self, name, person_id):
+        """
+        Adds a person_id under a lowercase name.
+        """
+        self.added.setdefault(name, set()).add(person_id)
+
+    def items(self):
+        for i in range(len(self.keys)):
+            yield self.keys[i], self.get(self.keys[i])
+        for name in self.added:
+            if self.position(name) is None:
+                yield name, self.added[name]
+
+
+def string_table(strings, typecode="q"):
+    """
+    Encodes strings into (offsets, data) for a StringTable,
+    with offsets of the array type `typecode`.
+    """
+    offsets = array(typecode, [0])
+    data = bytearray()
+    for string in strings:
+        data += string.encode("utf-8")
+        offsets.append(len(data))
+    return offsets, bytes(data)
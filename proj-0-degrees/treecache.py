@@ -0,0 +1,171 @@
+import sys
+import threading
+
+from array import array
+from collections import OrderedDict
+
+# People expanded by building trees so far
+expanded = 0
+
+
+class Parents(dict):
+    """
+    Parent table for people keyed by IMDB id, -1 when not reached.
+    """
+
+    def __missing__(self, key):
+        return -1
+
+
+def parent_table(size=None):
+    """
+    Returns an empty parent table, an int32 array when people
+    are dense indices below `size`, else a Parents dictionary.
+    """
+    if size is None:
+        return Parents()
+    return array("i", [-1]) * size
+
+
+class ParentTree():
+    """
+    Complete BFS tree from one source person: every reached person
+    points at the movie and person one step closer to the source.
+    """
+
+    def __init__(self, source, movies, parents):
+        self.source = source
+        self.movies = movies
+        self.parents = parents
+
+    @classmethod
+    def build(cls, source, movies_of, stars_of, size=None):
+        """
+        Runs a BFS over the whole component of `source`.
+        """
+        global expanded
+
+        movies = parent_table(size)
+        parents = parent_table(size)
+        parents[source] = source
+        seen_movies = set()
+        layer = [source]
+
+        while layer:
+            next_layer = []
+            for person in layer:
+                expanded += 1
+                for movie in movies_of(person):
+                    if movie in seen_movies:
+                        continue
+                    seen_movies.add(movie)
+                    for star in stars_of(movie):
+                        if parents[star] == -1:
+                            parents[star] = person
+                            movies[star] = movie
+                            next_layer.append(star)
+            layer = next_layer
+
+        return cls(source, movies, parents)
+
+    def path_from(self, person):
+        """
+        Returns the (movie, person) pairs leading from `person`
+        to the source, or None if `person` was not reached.
+        """
+        if self.parents[person] == -1:
+            return None
+        pairs = []
+        while person != self.source:
+            movie = self.movies[person]
+            person = self.parents[person]
+            pairs.append((movie, person))
+        return pairs
+
+    def path_to(self, person):
+        """
+        Returns the (movie, person) pairs leading from the source
+        to `person`, or None if `person` was not reached.
+        """
+        if self.parents[person] == -1:
+            return None
+        pairs = []
+        while person != self.source:
+            pairs.append((self.movies[person], person))
+            person = self.parents[person]
+        pairs.reverse()
+        return pairs
+
+    def nbytes(self):
+        """
+        Returns the approximate memory used by the tree.
+        """
+        if isinstance(self.parents, array):
+            return (len(self.movies) * self.movies.itemsize
+                    + len(self.parents) * self.parents.itemsize)
+        return sys.getsizeof(self.movies) + sys.getsizeof(self.parents)
+
+
+class TreeCache():
+    """
+    Least recently used ParentTrees keyed by source,
+    holding at most `max_bytes` of trees.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.trees = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, source, target):
+        """
+        Returns the cached tree of `source`, else that of `target`
+        (paths can be walked both ways), else None.
+        """
+        with self.lock:
+            for root in (source, target):
+                tree = self.trees.get(root)
+                if tree is not None:
+                    self.hits += 1
+                    self.trees.move_to_end(root)
+                    return tree
+            self.misses += 1
+            return None
+
+    def put(self, tree):
+        """
+        Caches a tree, evicting the least recently used ones to make
+        room. A tree larger than the whole budget is not cached.
+        """
+        size = tree.nbytes()
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if tree.source in self.trees:
+                return
+            while self.trees and self.bytes + size > self.max_bytes:
+                _, evicted = self.trees.popitem(last=False)
+                self.bytes -= evicted.nbytes()
+            self.trees[tree.source] = tree
+            self.bytes += size
+
+    def clear(self):
+        with self.lock:
+            self.trees.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the current size of the cache.
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "trees": len(self.trees),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
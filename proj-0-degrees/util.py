@@ -1,3 +1,7 @@
+from array import array
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +40,123 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    def __init__(self):
+        self.frontier = deque()
+
+        # Maps each state to how many of its nodes are in the frontier
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.pop()
+            self.discard(node)
+            return node
+
+    def discard(self, node):
+        count = self.states[node.state] - 1
+        if count:
+            self.states[node.state] = count
+        else:
+            del self.states[node.state]
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            self.discard(node)
+            return node
+
+
+class DisjointSet():
+    """
+    Union-find over hashable items, or over the dense integers
+    below `size` when it is given.
+    """
+
+    def __init__(self, size=None):
+        if size is None:
+            self.parent = {}
+            self.size = {}
+        else:
+            self.parent = array("i", range(size))
+            self.size = array("i", [1]) * size
+
+    @classmethod
+    def from_arrays(cls, parent, size):
+        """
+        Restores a dense union-find from its parent and size arrays.
+        """
+        components = cls()
+        components.parent = array("i", parent)
+        components.size = array("i", size)
+        return components
+
+    def add(self, item):
+        if isinstance(self.parent, dict):
+            if item not in self.parent:
+                self.parent[item] = item
+                self.size[item] = 1
+        else:
+            while len(self.parent) <= item:
+                self.parent.append(len(self.parent))
+                self.size.append(1)
+
+    def find(self, item):
+        parent = self.parent
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+
+        # Path compression
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union(self, a, b):
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return a
+
+        # Union by size
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+    def connected(self, a, b):
+        return self.find(a) == self.find(b)
+
+    def component_size(self, item):
+        return self.size[self.find(item)]
+
+    def component_sizes(self):
+        """
+        Returns the size of every component.
+        """
+        if isinstance(self.parent, dict):
+            items = self.parent
+        else:
+            items = range(len(self.parent))
+        return [self.size[item] for item in items
+                if self.parent[item] == item]
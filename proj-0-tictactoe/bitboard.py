@@ -0,0 +1,416 @@
+"""
+Bitboard engine for Tic Tac Toe.
+
+A position is two integers with one bit per cell, set for the cells
+X and O have taken. Moves are made and unmade in place, and a move
+wins when it completes one of the precomputed line masks through it.
+
+Any rows x cols board with k in a row to win is supported. The search
+deepens one ply at a time until the game is solved or the time limit
+is up, scoring positions at the depth limit with a heuristic.
+"""
+
+import math
+import time
+
+# Marks on list boards, as in tictactoe.py
+MARKS = ["X", "O"]
+
+# Bound types of transposition table values
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Score of a win for the player to move, less one per ply until it
+# happens so that faster wins score higher. Heuristic scores stay
+# far below it
+WIN = 10 ** 9
+
+# Heuristic score of an open line by the number of marks on it,
+# capped at 4 marks
+LINE_SCORES = [0, 1, 10, 100, 1000]
+
+# On boards with more cells than this, only empty cells next to
+# taken ones are searched, and the first move is in the centre
+WIDE_BOARD = 49
+
+# Transposition tables by board size, each mapping the (X, O) bitmasks
+# of a position to [value, bound type, best move, depth]. Kept between
+# calls, and cleared when one grows past TABLE_SIZE
+tables = {}
+TABLE_SIZE = 2000000
+
+# Line and neighbor masks by board size, see geometry
+geometries = {}
+
+
+class Timeout(Exception):
+    """
+    Raised inside a search when its time limit is up,
+    or when it was cancelled.
+    """
+
+
+def line_masks(rows, cols, k):
+    """
+    Returns the bitmask of every line of k cells on a rows x cols board.
+    """
+    lines = []
+    for i in range(rows):
+        for j in range(cols):
+            for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                end_i = i + (k - 1) * di
+                end_j = j + (k - 1) * dj
+                if not (0 <= end_i < rows and 0 <= end_j < cols):
+                    continue
+                mask = 0
+                for step in range(k):
+                    mask |= 1 << ((i + step * di) * cols + j + step * dj)
+                lines.append(mask)
+    return lines
+
+
+def neighbor_masks(rows, cols):
+    """
+    Returns for every cell the bitmask of the cells around it.
+    """
+    masks = []
+    for i in range(rows):
+        for j in range(cols):
+            mask = 0
+            for ni in range(max(0, i - 1), min(rows, i + 2)):
+                for nj in range(max(0, j - 1), min(cols, j + 2)):
+                    mask |= 1 << (ni * cols + nj)
+            masks.append(mask)
+    return masks
+
+
+def geometry(rows, cols, k):
+    """
+    Returns (line masks, line masks through each cell, neighbor masks
+    of each cell) for a board size, computed once per size.
+    """
+    key = (rows, cols, k)
+    if key not in geometries:
+        lines = line_masks(rows, cols, k)
+        cell_lines = [
+            [line for line in lines if line >> cell & 1]
+            for cell in range(rows * cols)
+        ]
+        geometries[key] = (lines, cell_lines, neighbor_masks(rows, cols))
+    return geometries[key]
+
+
+class Position():
+    """
+    Board position with the player to move, changed in place by
+    make and unmake.
+    """
+
+    def __init__(self, rows=3, cols=3, k=3):
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.full = (1 << rows * cols) - 1
+        self.lines, self.cell_lines, self.neighbors = geometry(rows, cols, k)
+        self.boards = [0, 0]
+        self.turn = 0
+        self.history = []
+
+        # Heuristic score for X, kept up to date by every move
+        self.score = 0
+        self.score_changes = []
+
+    @classmethod
+    def from_board(cls, board, k=3):
+        """
+        Returns the position of a list board.
+        """
+        position = cls(len(board), len(board[0]), k)
+        for i, row in enumerate(board):
+            for j, cell in enumerate(row):
+                if cell is not None:
+                    position.make_mark(i * position.cols + j,
+                                       MARKS.index(cell))
+
+        # X moves first, so it is O's turn when X has more marks
+        counts = [bin(bits).count("1") for bits in position.boards]
+        position.turn = 1 if counts[0] > counts[1] else 0
+        return position
+
+    def make_mark(self, cell, player):
+        """
+        Marks a cell for a given player, whoever is to move.
+        """
+        before = self.line_scores(cell)
+        self.boards[player] |= 1 << cell
+        change = self.line_scores(cell) - before
+        self.score += change
+        self.score_changes.append(change)
+        self.history.append(cell)
+
+    def make(self, cell):
+        """
+        Marks a cell for the player to move.
+        """
+        self.make_mark(cell, self.turn)
+        self.turn ^= 1
+
+    def unmake(self):
+        """
+        Takes back the last move.
+        """
+        cell = self.history.pop()
+        self.score -= self.score_changes.pop()
+        self.turn ^= 1
+        self.boards[self.turn] &= ~(1 << cell)
+
+    def line_scores(self, cell):
+        """
+        Returns the heuristic score for X of the lines through a cell:
+        lines only one player has marks on count for that player, more
+        so the more marks they hold.
+        """
+        x, o = self.boards
+        score = 0
+        for line in self.cell_lines[cell]:
+            if line & x:
+                if not line & o:
+                    score += LINE_SCORES[min(4, bin(line & x).count("1"))]
+            elif line & o:
+                score -= LINE_SCORES[min(4, bin(line & o).count("1"))]
+        return score
+
+    def wins(self, cell):
+        """
+        Returns True if the last move, at `cell`, completed a line.
+        """
+        bits = self.boards[self.turn ^ 1]
+        for line in self.cell_lines[cell]:
+            if bits & line == line:
+                return True
+        return False
+
+    def winner(self):
+        """
+        Returns the index of the player with a line, or None.
+        """
+        for player in range(2):
+            for line in self.lines:
+                if self.boards[player] & line == line:
+                    return player
+        return None
+
+    def filled(self):
+        return self.boards[0] | self.boards[1] == self.full
+
+    def moves(self):
+        """
+        Returns the empty cells worth searching, centre first.
+        """
+        taken = self.boards[0] | self.boards[1]
+        free = self.full & ~taken
+        if self.rows * self.cols > WIDE_BOARD:
+            if not taken:
+                centre = (self.rows // 2) * self.cols + self.cols // 2
+                return [centre]
+            near = 0
+            for cell in self.history:
+                near |= self.neighbors[cell]
+            free &= near
+
+        cells = []
+        while free:
+            low = free & -free
+            cells.append(low.bit_length() - 1)
+            free ^= low
+        cells.sort(key=self.distance_from_centre)
+        return cells
+
+    def distance_from_centre(self, cell):
+        i, j = divmod(cell, self.cols)
+        return abs(2 * i - self.rows + 1) + abs(2 * j - self.cols + 1)
+
+    def evaluate(self):
+        """
+        Returns the heuristic score for the player to move.
+        """
+        return self.score if self.turn == 0 else -self.score
+
+
+class Search():
+    """
+    Iterative deepening alpha-beta search over a transposition table.
+    """
+
+    def __init__(self, table, time_limit=None, progress=None):
+        self.table = table
+        self.deadline = None
+        if time_limit is not None:
+            self.deadline = time.perf_counter() + time_limit
+        self.nodes = 0
+        self.cutoffs = 0
+        self.tt_hits = 0
+        self.max_depth = 0
+
+        # Moves on the board when the search started, to measure
+        # the depth reached from
+        self.root = 0
+
+        # Shared with other threads: updated with the nodes searched and
+        # the best move so far, and cancels the search when set
+        self.progress = progress
+
+        # Positions scored by the heuristic (or from a table entry that
+        # was), so the search was not exact
+        self.horizon = 0
+
+    def best_move(self, position):
+        """
+        Returns the best move found in the time limit: the move of the
+        deepest search that finished, each deeper search trying the
+        previous best moves first.
+        """
+        best_cell = position.moves()[0]
+        self.root = len(position.history)
+        depth = 1
+        while True:
+            self.horizon = 0
+            try:
+                value, cell = self.negamax(
+                    position, depth, -math.inf, math.inf
+                )
+            except Timeout:
+                break
+            best_cell = cell
+            if self.progress is not None:
+                self.progress.depth = depth
+                self.progress.best_action = divmod(cell, position.cols)
+
+            # Solved, or a win or loss was found
+            if self.horizon == 0 or abs(value) > WIN // 2:
+                break
+            depth += 1
+        self.report()
+        return best_cell
+
+    def report(self):
+        """
+        Copies the counters of the search to its progress.
+        """
+        if self.progress is not None:
+            self.progress.nodes = self.nodes
+            self.progress.cutoffs = self.cutoffs
+            self.progress.tt_hits = self.tt_hits
+            self.progress.max_depth = self.max_depth
+
+    def negamax(self, position, depth, alpha, beta):
+        """
+        Returns [value, best move] of a position that is not over,
+        searching `depth` plies before falling back on the heuristic.
+        Values are for the player to move.
+        """
+        self.nodes += 1
+        if self.nodes % 128 == 0:
+            if (self.deadline is not None
+                    and time.perf_counter() > self.deadline):
+                raise Timeout()
+            if self.progress is not None:
+                self.report()
+                if self.progress.cancelled.is_set():
+                    raise Timeout()
+        self.max_depth = max(self.max_depth,
+                             len(position.history) - self.root)
+
+        if depth == 0:
+            self.horizon += 1
+            return [position.evaluate(), None]
+
+        # Stored value is enough, or narrows the window
+        key = (position.boards[0], position.boards[1])
+        entry = self.table.get(key)
+        best_cell = None
+        if entry is not None:
+            value, bound, best_cell, searched = entry
+            if searched >= depth:
+                self.tt_hits += 1
+                if searched != math.inf:
+                    self.horizon += 1
+                if bound == EXACT:
+                    return [value, best_cell]
+                if bound == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return [value, best_cell]
+        window = (alpha, beta)
+        horizon = self.horizon
+
+        # Try the stored best move first, from the previous iteration
+        # or an earlier call
+        moves = position.moves()
+        if best_cell in moves:
+            moves.remove(best_cell)
+            moves.insert(0, best_cell)
+
+        value = -math.inf
+        for cell in moves:
+            position.make(cell)
+            if position.wins(cell):
+                score = WIN
+            elif position.filled():
+                score = 0
+            else:
+                score = -self.negamax(position, depth - 1, -beta, -alpha)[0]
+
+                # A win or loss further away is worth less
+                if score > WIN // 2:
+                    score -= 1
+                elif score < -WIN // 2:
+                    score += 1
+            position.unmake()
+
+            if score > value:
+                value = score
+                best_cell = cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                self.cutoffs += 1
+                break
+
+        # Outside the searched window the value is only a bound
+        if value <= window[0]:
+            bound = UPPER
+        elif value >= window[1]:
+            bound = LOWER
+        else:
+            bound = EXACT
+
+        # Exact for any depth if no position was scored by the heuristic
+        searched = math.inf if self.horizon == horizon else depth
+        self.table[key] = [value, bound, best_cell, searched]
+
+        return [value, best_cell]
+
+
+def best_move(board, k=3, time_limit=None, progress=None):
+    """
+    Returns the optimal action (i, j) for the player to move on a list
+    board with `k` in a row to win, or None if the game is over.
+
+    With a `time_limit` in seconds, returns the best action found
+    by then instead. A `progress` (see tictactoe.Progress) follows
+    the search and can cancel it, which also returns the best
+    action found so far.
+    """
+    position = Position.from_board(board, k)
+    if position.winner() is not None or position.filled():
+        return None
+
+    table = tables.setdefault((position.rows, position.cols, k), {})
+    if len(table) > TABLE_SIZE:
+        table.clear()
+
+    cell = Search(table, time_limit, progress).best_move(position)
+    return divmod(cell, position.cols)
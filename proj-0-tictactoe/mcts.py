@@ -0,0 +1,221 @@
+"""
+Monte Carlo Tree Search engine for Tic Tac Toe.
+
+The tree is grown with the game's own rules (player, actions, result,
+winner and terminal), picking moves by UCT: a move's average result,
+plus a bonus for moves tried less often. Each new leaf is scored by a
+batch of random playouts, played on integer bitmasks for speed.
+"""
+
+import math
+import random
+import time
+
+import bitboard
+
+# Marks on list boards, as in tictactoe.py
+MARKS = ["X", "O"]
+
+
+class Node():
+    """
+    Position in the search tree, with the results of the playouts
+    through it for the player who moved into it.
+    """
+
+    def __init__(self, board, parent=None, action=None, mover=None):
+        self.board = board
+        self.parent = parent
+        self.action = action
+        self.mover = mover
+        self.children = []
+        self.untried = None
+        self.terminal = False
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MonteCarlo():
+    """
+    UCT search over the game functions, keeping its tree between calls
+    so that the playouts below the moves actually played are reused.
+    """
+
+    def __init__(self, player, actions, result, winner, terminal,
+                 exploration=math.sqrt(2), seed=None):
+        self.player = player
+        self.actions = actions
+        self.result = result
+        self.winner = winner
+        self.terminal = terminal
+        self.exploration = exploration
+        self.random = random.Random(seed)
+        self.root = None
+
+    def reset(self):
+        """
+        Forgets the tree, for a new game or board size.
+        """
+        self.root = None
+
+    def best_move(self, board, k=3, playouts=20000, batch=16,
+                  time_limit=None, progress=None):
+        """
+        Returns the most visited move after `playouts` random playouts,
+        run `batch` at a time from each new leaf, or fewer if the time
+        limit is up or `progress` (see tictactoe.Progress) is cancelled.
+        """
+        root = self.reuse(board)
+        self.root = root
+        self.open(root)
+        if root.terminal:
+            return None
+
+        deadline = None
+        if time_limit is not None:
+            deadline = time.perf_counter() + time_limit
+        _, cell_lines, _ = bitboard.geometry(len(board), len(board[0]), k)
+
+        done = 0
+        while done < playouts:
+            node = self.expand(self.select(root))
+            results = self.simulate(node, batch, cell_lines)
+            self.backpropagate(node, results)
+
+            done += batch
+            if progress is not None:
+                progress.nodes = done
+                progress.max_depth = max(progress.max_depth,
+                                         self.depth(node))
+                progress.best_action = self.most_visited(root).action
+                if progress.cancelled.is_set():
+                    break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+
+        return self.most_visited(root).action
+
+    def reuse(self, board):
+        """
+        Returns the node of `board` if it is the root or within two
+        moves of it, as after our move and the opponent's, or a new
+        root otherwise.
+        """
+        if self.root is not None:
+            nodes = [self.root]
+            for child in self.root.children:
+                nodes.append(child)
+                nodes.extend(child.children)
+            for node in nodes:
+                if node.board == board:
+                    node.parent = None
+                    return node
+        return Node([row[:] for row in board])
+
+    def open(self, node):
+        """
+        Fills in the moves left to try from a node, once.
+        """
+        if node.untried is not None:
+            return
+        node.terminal = self.terminal(node.board)
+        node.untried = [] if node.terminal else list(self.actions(node.board))
+        self.random.shuffle(node.untried)
+
+    def select(self, node):
+        """
+        Walks down by UCT while every move of a node has been tried.
+        """
+        while not node.terminal and not node.untried:
+            log_visits = math.log(node.visits)
+            node = max(node.children, key=lambda child: (
+                child.wins / child.visits
+                + self.exploration * math.sqrt(log_visits / child.visits)
+            ))
+        return node
+
+    def expand(self, node):
+        """
+        Adds a child for one untried move of a node, and returns it.
+        """
+        if node.terminal:
+            return node
+        action = node.untried.pop()
+        child = Node(self.result(node.board, action), node, action,
+                     self.player(node.board))
+        self.open(child)
+        node.children.append(child)
+        return child
+
+    def simulate(self, node, batch, cell_lines):
+        """
+        Returns how many of `batch` random playouts from a node each
+        player won, by index in MARKS, and how many were ties (last).
+        """
+        results = [0, 0, 0]
+        if node.terminal:
+            winner = self.winner(node.board)
+            results[MARKS.index(winner) if winner is not None else 2] = batch
+            return results
+
+        # Bitmasks of each player's cells, and the empty cells
+        boards = [0, 0]
+        free = []
+        cols = len(node.board[0])
+        for i, row in enumerate(node.board):
+            for j, cell in enumerate(row):
+                if cell is None:
+                    free.append(i * cols + j)
+                else:
+                    boards[MARKS.index(cell)] |= 1 << (i * cols + j)
+        first = MARKS.index(self.player(node.board))
+
+        for _ in range(batch):
+            self.random.shuffle(free)
+            results[playout(boards, first, free, cell_lines)] += 1
+        return results
+
+    def backpropagate(self, node, results):
+        """
+        Adds the playout results to a node and everyone above it.
+        """
+        batch = sum(results)
+        while node is not None:
+            node.visits += batch
+            if node.mover is not None:
+                node.wins += results[MARKS.index(node.mover)] + results[2] / 2
+            node = node.parent
+
+    def depth(self, node):
+        """
+        Returns the number of moves from the root down to a node.
+        """
+        depth = 0
+        while node.parent is not None:
+            node = node.parent
+            depth += 1
+        return depth
+
+    def most_visited(self, node):
+        return max(node.children, key=lambda child: child.visits)
+
+
+def playout(boards, turn, cells, cell_lines):
+    """
+    Plays `cells` in order, alternating players from `turn`, and
+    returns the index of the first player to complete a line,
+    or 2 for a tie.
+    """
+    x, o = boards
+    for cell in cells:
+        if turn == 0:
+            x |= 1 << cell
+            bits = x
+        else:
+            o |= 1 << cell
+            bits = o
+        for line in cell_lines[cell]:
+            if bits & line == line:
+                return turn
+        turn ^= 1
+    return 2
@@ -1,9 +1,29 @@
 import pygame
 import sys
+import threading
 import time
 
 import tictactoe as ttt
 
+# Optional board size and win length: python runner.py rows cols k
+if len(sys.argv) == 4:
+    ttt.configure(*(int(arg) for arg in sys.argv[1:]))
+elif len(sys.argv) != 1:
+    sys.exit("Usage: python runner.py [rows cols k]")
+
+
+def think(board, progress, moves):
+    """
+    Finds the computer's move on a worker thread, so the window
+    keeps responding while it searches. Adds the move to `moves`,
+    or the exception the search raised.
+    """
+    try:
+        moves.append(ttt.minimax(board, progress))
+    except Exception as error:
+        moves.append(error)
+
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,16 +35,27 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Tiles shrink to fit larger boards between the title and the button
+tile_size = min(80, (height - 140) // ttt.ROWS, (width - 40) // ttt.COLS)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+clock = pygame.time.Clock()
+
+# Search for the computer's move: worker thread, its progress
+# and the list the move (or an error) is added to when done
+worker = None
+progress = None
+ai_moves = []
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if progress is not None:
+                progress.cancel()
             sys.exit()
 
     screen.fill(black)
@@ -67,13 +98,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (ttt.COLS / 2 * tile_size),
+                       height / 2 - (ttt.ROWS / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(ttt.ROWS):
             row = []
-            for j in range(3):
+            for j in range(ttt.COLS):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -108,22 +138,42 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, searched on a worker thread
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
+            if worker is None:
+                progress = ttt.Progress()
+                ai_moves = []
+                worker = threading.Thread(
+                    target=think, args=(board, progress, ai_moves),
+                    daemon=True
+                )
+                worker.start()
+            elif not worker.is_alive():
+                worker = None
+
+                # Raise what went wrong in the search here, where it
+                # is seen; without a move the search starts again
+                if ai_moves and isinstance(ai_moves[0], Exception):
+                    raise ai_moves[0]
+                if ai_moves and ai_moves[0] is not None:
+                    board = ttt.result(board, ai_moves[0])
             else:
-                ai_turn = True
+                # Show how the search is going
+                status = f"Searched {progress.nodes} positions"
+                if progress.best_action is not None:
+                    i, j = progress.best_action
+                    status += f", best so far ({i}, {j})"
+                status = mediumFont.render(status, True, white)
+                statusRect = status.get_rect()
+                statusRect.center = ((width / 2), height - 40)
+                screen.blit(status, statusRect)
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(ttt.ROWS):
+                for j in range(ttt.COLS):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -141,6 +191,6 @@ while True:
                     time.sleep(0.2)
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
 
     pygame.display.flip()
+    clock.tick(30)
@@ -0,0 +1,183 @@
+"""
+Plays games between two engine configurations without a display,
+and reports the outcomes and the work each one did per move.
+
+Usage: python selfplay.py [--games N] [--size ROWS COLS K] [--seed S]
+                          engine engine
+
+An engine is a name, optionally followed by settings, such as
+"bitboard,time=0.1" or "mcts,playouts=2000". Names are "table",
+"bitboard", "alphabeta", "mcts" and "random"; settings are "time"
+(seconds per move) and "playouts". The engines swap X and O every
+game, X moving first.
+"""
+
+import random
+import sys
+
+import mcts
+import tictactoe as ttt
+
+ENGINES = ["table", "bitboard", "alphabeta", "mcts", "random"]
+
+
+class Engine():
+    """
+    Engine configuration with its own search tables, so that the two
+    players of a game never share what they learned, and the totals
+    of its moves over every game.
+    """
+
+    def __init__(self, spec, seed=0):
+        name, *settings = spec.split(",")
+        if name not in ENGINES:
+            raise Exception(f"Unknown engine {name}, try one of {ENGINES}")
+        self.spec = spec
+        self.name = name
+        self.time_limit = ttt.TIME_LIMIT
+        self.playouts = ttt.PLAYOUTS
+        for setting in settings:
+            key, _, value = setting.partition("=")
+            if key == "time":
+                self.time_limit = float(value) if value != "none" else None
+            elif key == "playouts":
+                self.playouts = int(value)
+            else:
+                raise Exception(f"Unknown setting {setting} of {name}")
+
+        self.random = random.Random(seed)
+        self.bitboard_tables = {}
+        self.transpositions = {}
+        self.tree_search = mcts.MonteCarlo(
+            ttt.player, ttt.actions, ttt.result, ttt.winner, ttt.terminal,
+            seed=seed
+        )
+
+        self.wins = 0
+        self.losses = 0
+        self.ties = 0
+        self.moves = 0
+        self.seconds = 0
+        self.max_seconds = 0
+        self.nodes = 0
+        self.cutoffs = 0
+        self.tt_hits = 0
+        self.max_depth = 0
+
+    def move(self, board):
+        """
+        Returns the engine's action on a board, counting its work.
+        """
+        if self.name == "random":
+            action = self.random.choice(sorted(ttt.actions(board)))
+            self.moves += 1
+            return action
+
+        # The tictactoe module plays with whichever tables are in place
+        ttt.bitboard.tables = self.bitboard_tables
+        ttt.transpositions = self.transpositions
+        ttt.tree_search = self.tree_search
+        ttt.USE_TABLE = self.name == "table"
+        ttt.ENGINE = "bitboard" if self.name == "table" else self.name
+        ttt.TIME_LIMIT = self.time_limit
+        ttt.PLAYOUTS = self.playouts
+
+        action = ttt.minimax(board)
+        stats = ttt.stats
+        self.moves += 1
+        self.seconds += stats.seconds
+        self.max_seconds = max(self.max_seconds, stats.seconds)
+        self.nodes += stats.nodes
+        self.cutoffs += stats.cutoffs
+        self.tt_hits += stats.tt_hits
+        self.max_depth = max(self.max_depth, stats.max_depth)
+        return action
+
+    def new_game(self):
+        """
+        Forgets the search tree of the last game. Transposition tables
+        are kept, as they are between games in the runner.
+        """
+        self.tree_search.reset()
+
+    def report(self):
+        """
+        Returns lines describing the outcomes and work of the engine.
+        """
+        moves = max(self.moves, 1)
+        rate = self.nodes / self.seconds if self.seconds else 0
+        return [
+            f"{self.spec}: {self.wins} wins, {self.losses} losses, "
+            f"{self.ties} ties",
+            f"  {self.moves} moves, {self.nodes} nodes, "
+            f"{rate:.0f} nodes/sec",
+            f"  time per move: mean {self.seconds / moves * 1000:.2f} ms, "
+            f"max {self.max_seconds * 1000:.2f} ms",
+            f"  {self.cutoffs} cutoffs, {self.tt_hits} TT hits, "
+            f"max depth {self.max_depth}",
+        ]
+
+
+def main():
+    args = sys.argv[1:]
+    games = 10
+    size = (3, 3, 3)
+    seed = 0
+    try:
+        while args and args[0].startswith("--"):
+            if args[0] == "--games":
+                games = int(args[1])
+                args = args[2:]
+            elif args[0] == "--size":
+                size = tuple(int(arg) for arg in args[1:4])
+                args = args[4:]
+            elif args[0] == "--seed":
+                seed = int(args[1])
+                args = args[2:]
+            else:
+                raise ValueError()
+    except (IndexError, ValueError):
+        args = []
+    if len(args) != 2 or len(size) != 3:
+        sys.exit("Usage: python selfplay.py [--games N] "
+                 "[--size ROWS COLS K] [--seed S] engine engine")
+
+    ttt.configure(*size)
+    engines = [Engine(args[0], seed), Engine(args[1], seed + 1)]
+    for game in range(games):
+        players = engines if game % 2 == 0 else engines[::-1]
+        winner = play(players)
+        if winner is None:
+            for engine in engines:
+                engine.ties += 1
+        else:
+            winner.wins += 1
+            players[players.index(winner) ^ 1].losses += 1
+
+    rows, cols, k = size
+    print(f"{games} games on {rows}x{cols}, {k} in a row")
+    for engine in engines:
+        print("\n".join(engine.report()))
+
+
+def play(players):
+    """
+    Plays one game, the first player as X, and returns the winning
+    engine or None for a tie.
+    """
+    for engine in players:
+        engine.new_game()
+
+    board = ttt.initial_state()
+    while not ttt.terminal(board):
+        engine = players[0] if ttt.player(board) == ttt.X else players[1]
+        board = ttt.result(board, engine.move(board))
+
+    winner = ttt.winner(board)
+    if winner is None:
+        return None
+    return players[0] if winner == ttt.X else players[1]
+
+
+if __name__ == "__main__":
+    main()
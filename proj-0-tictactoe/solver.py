@@ -0,0 +1,120 @@
+"""
+Solves 3x3 Tic Tac Toe and writes the perfect-play table that
+tictactoe.py loads, or checks the search engines against it.
+
+Usage: python solver.py [--verify]
+"""
+
+import sys
+
+import bitboard
+import tictactoe as ttt
+
+
+def main():
+    if len(sys.argv) == 1:
+        table = solve()
+        with open(ttt.TABLE_PATH, "wb") as f:
+            f.write(ttt.TABLE_MAGIC)
+            f.write(table)
+        reachable = sum(1 for entry in table if entry & 0x80)
+        print(f"Wrote {reachable} positions to {ttt.TABLE_PATH}")
+    elif sys.argv[1:] == ["--verify"]:
+        if ttt.TABLE is None:
+            sys.exit(f"No table at {ttt.TABLE_PATH}, run solver.py first")
+        errors = verify()
+        for error in errors:
+            print(error)
+        print(f"{len(errors)} errors")
+        sys.exit(1 if errors else 0)
+    else:
+        sys.exit("Usage: python solver.py [--verify]")
+
+
+def solve():
+    """
+    Returns the table entries of every board reachable from the
+    empty board, by a search of the whole game.
+    """
+    ttt.configure(3, 3, 3)
+    table = bytearray(ttt.TABLE_SIZE)
+    scores = {}
+
+    def score(board):
+        """
+        Returns the utility of a board under perfect play, scaled by
+        one plus the number of empty cells left when the game ends, so
+        that faster wins and slower losses score higher.
+        """
+        index = ttt.table_index(board)
+        if index in scores:
+            return scores[index]
+
+        if ttt.terminal(board):
+            empty = sum(row.count(ttt.EMPTY) for row in board)
+            best, best_action = ttt.utility(board) * (1 + empty), None
+        else:
+            # X maximizes, O minimizes; ties go to the first cell
+            sign = 1 if ttt.player(board) == ttt.X else -1
+            best, best_action = None, None
+            for action in sorted(ttt.actions(board)):
+                child = sign * score(ttt.result(board, action))
+                if best is None or child > best:
+                    best, best_action = child, action
+            best *= sign
+
+        value = (best > 0) - (best < 0)
+        cell = 0xF
+        if best_action is not None:
+            cell = 3 * best_action[0] + best_action[1]
+        table[index] = 0x80 | (value + 2) << 4 | cell
+        scores[index] = best
+        return best
+
+    score(ttt.initial_state())
+    return table
+
+
+def verify():
+    """
+    Returns a description of every reachable board on which a search
+    engine plays a move worse than perfect play, or gets the value
+    of the board wrong.
+    """
+    ttt.configure(3, 3, 3)
+    errors = []
+    for index in range(ttt.TABLE_SIZE):
+        board = board_for(index)
+        entry = ttt.table_entry(board)
+        if entry is None or entry[1] is None:
+            continue
+        value = entry[0]
+
+        engines = {
+            "alphabeta": ttt.alpha_beta(board),
+            "bitboard": [None, bitboard.best_move(board)],
+        }
+        for engine, (engine_value, action) in engines.items():
+            if engine_value is not None and engine_value != value:
+                errors.append(f"{engine}: value {engine_value} instead of "
+                              f"{value} on {board}")
+            if ttt.table_entry(ttt.result(board, action))[0] != value:
+                errors.append(f"{engine}: {action} is not optimal "
+                              f"on {board}")
+    return errors
+
+
+def board_for(index):
+    """
+    Returns the 3x3 board with a given table index.
+    """
+    cells = []
+    for _ in range(9):
+        index, digit = divmod(index, 3)
+        cells.append([ttt.EMPTY, ttt.X, ttt.O][digit])
+    cells.reverse()
+    return [cells[0:3], cells[3:6], cells[6:9]]
+
+
+if __name__ == "__main__":
+    main()
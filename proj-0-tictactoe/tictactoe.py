@@ -4,19 +4,116 @@ Tic Tac Toe Player
 
 import math
 import copy
+import os
+import threading
+import time
+
+import bitboard
+import mcts
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Board size and the number of marks in a row that wins,
+# see configure
+ROWS = 3
+COLS = 3
+K = 3
+
+# Seconds the bitboard engine may think per minimax call, None for
+# no limit. The 3x3 game is solved well within it
+TIME_LIMIT = 1.0
+
+# Search used by minimax: "bitboard" (integer bitmask positions,
+# see bitboard.py), "alphabeta" (alpha_beta on list boards) or
+# "mcts" (Monte Carlo Tree Search, see mcts.py)
+ENGINE = "bitboard"
+
+# Answer 3x3 boards from the perfect-play table, whatever the engine
+USE_TABLE = True
+
+# Random playouts per move of the "mcts" engine, within TIME_LIMIT
+PLAYOUTS = 20000
+
+# Bound types of transposition table values
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# The 8 rotations and reflections of a square board, as functions
+# of a cell (i, j) and the last row and column r and c, and the index
+# of the inverse of each. Only the first 4 keep a board's shape
+# when it is not square
+SYMMETRIES = [
+    lambda i, j, r, c: (i, j),
+    lambda i, j, r, c: (r - i, c - j),
+    lambda i, j, r, c: (i, c - j),
+    lambda i, j, r, c: (r - i, j),
+    lambda i, j, r, c: (j, r - i),
+    lambda i, j, r, c: (c - j, i),
+    lambda i, j, r, c: (j, i),
+    lambda i, j, r, c: (c - j, r - i),
+]
+INVERSES = [0, 1, 2, 3, 5, 4, 6, 7]
+
+# Perfect-play table of the 3x3 game written by solver.py: a magic
+# number, then one byte per board by its base-3 index (see table_index).
+# A reachable board's byte has the high bit set, its value (1 for O
+# wins, 2 for a tie, 3 for X wins) in bits 4-5 and the cell of its
+# best move in bits 0-3, 15 if the game is over
+TABLE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "tictactoe.table"
+)
+TABLE_MAGIC = b"TTT1"
+TABLE_SIZE = 3 ** 9
+
+# Maps canonical board keys to [value, bound type, best move],
+# with the move on the canonical board. Kept between minimax calls
+transpositions = {}
+
+
+def configure(rows=3, cols=3, k=3):
+    """
+    Sets the board size and the number of marks in a row that wins,
+    for the boards made by initial_state from now on.
+    """
+    global ROWS, COLS, K, LINES
+
+    if k > max(rows, cols):
+        raise Exception("No line of k cells fits on the board!")
+    ROWS, COLS, K = rows, cols, k
+    LINES = lines(rows, cols, k)
+    transpositions.clear()
+    tree_search.reset()
+
+
+def lines(rows, cols, k):
+    """
+    Returns every line of k cells (i, j) on a rows x cols board.
+    """
+    found = []
+    for i in range(rows):
+        for j in range(cols):
+
+            # Right, down and both diagonals from (i, j)
+            for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                line = [(i + step * di, j + step * dj) for step in range(k)]
+                end_i, end_j = line[-1]
+                if 0 <= end_i < rows and 0 <= end_j < cols:
+                    found.append(line)
+    return found
+
+
+# Lines that win on the configured board
+LINES = lines(ROWS, COLS, K)
+
 
 def initial_state():
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * COLS for _ in range(ROWS)]
 
 
 def player(board):
@@ -93,31 +190,15 @@ def winner(board):
     Returns the winner of the game, if there is one.
     """
 
-    # Loop all X and Y possible wins
-    for i in range(3):
-
-        # If mutual cell is not empty
-        if board[i][i] is not EMPTY:
-
-            # Rows
-            if board[i][0] == board[i][1] and board[i][2] == board[i][1]:
-                return board[i][i]
+    # Loop all possible wins
+    for line in LINES:
 
-            # Columns
-            if board[0][i] == board[1][i] and board[2][i] == board[1][i]:
-                return board[i][i]
-
-    # Diagonals
-    # If middle is not empty check diagonals
-    if board[1][1] is not EMPTY:
-
-        # Left-Top to Right-Bottom
-        if board[0][0] == board[1][1] and board[2][2] == board[1][1]:
-            return board[1][1]
-
-        # Left-Bottom to Right-Top
-        if board[0][2] == board[1][1] and board[2][0] == board[1][1]:
-            return board[1][1]
+        # If first cell is not empty and the rest match it
+        i, j = line[0]
+        if board[i][j] is not EMPTY and all(
+            board[a][b] == board[i][j] for a, b in line[1:]
+        ):
+            return board[i][j]
 
     # No win
     return None
@@ -162,28 +243,181 @@ def utility(board):
     return 0
 
 
-def minimax(board):
+class Progress():
+    """
+    Work done by a minimax call, which other threads can follow: the
+    search keeps `nodes` and `best_action` up to date while it runs
+    (and `depth`, the last depth completed, if it deepens iteratively),
+    and stops early once cancel() is called. The other counters are
+    filled in when it ends.
+    """
+
+    def __init__(self):
+        self.engine = None
+        self.nodes = 0
+        self.depth = 0
+        self.best_action = None
+        self.cutoffs = 0
+        self.tt_hits = 0
+        self.max_depth = 0
+        self.seconds = 0
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class Cancelled(Exception):
+    """
+    Raised inside alpha_beta when its Progress was cancelled.
+    """
+
+
+def minimax(board, progress=None):
     """
     Returns the optimal action for the current player on the board.
+
+    With a `progress` (see Progress) the search can be followed and
+    cancelled from another thread. A cancelled search returns the best
+    action found so far, or None if it has none. Either way the
+    counters of the call are left in `stats`.
+    """
+    global stats
+
+    if progress is None:
+        progress = Progress()
+    start = time.perf_counter()
+    action = search(board, progress)
+    progress.seconds = time.perf_counter() - start
+    stats = progress
+    return action
+
+
+def search(board, progress):
+    """
+    Returns the optimal action on the board, with the configured engine.
     """
 
     # Just to be sure board is not terminal
     if terminal(board):
         return None
 
+    # The 3x3 game is solved, look the move up
+    if USE_TABLE and TABLE is not None and (ROWS, COLS, K) == (3, 3, 3):
+        entry = table_entry(board)
+        if entry is not None:
+            progress.engine = "table"
+            return entry[1]
+
+    # Bitboard engine converts the list board itself
+    progress.engine = ENGINE
+    if ENGINE == "bitboard":
+        return bitboard.best_move(board, K, TIME_LIMIT, progress)
+    if ENGINE == "mcts":
+        return tree_search.best_move(
+            board, K, PLAYOUTS, time_limit=TIME_LIMIT, progress=progress
+        )
+    if ENGINE != "alphabeta":
+        raise Exception(f"Unknown engine: {ENGINE}")
+
     # Return only best action
-    return alpha_beta(board)[1]
+    try:
+        return alpha_beta(board, progress=progress)[1]
+    except Cancelled:
+        return None
 
 
-def alpha_beta(state, alpha=-math.inf, beta=math.inf):
+def load_table(path=TABLE_PATH):
+    """
+    Returns the perfect-play table written by solver.py,
+    or None if there is no valid table at `path`.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if data[:len(TABLE_MAGIC)] != TABLE_MAGIC:
+        return None
+    data = data[len(TABLE_MAGIC):]
+    if len(data) != TABLE_SIZE:
+        return None
+    return data
+
+
+def table_index(board):
+    """
+    Returns the index of a 3x3 board in the table, reading the cells
+    row by row as base-3 digits: 0 for empty, 1 for X and 2 for O.
+    """
+    index = 0
+    for row in board:
+        for cell in row:
+            index = index * 3 + (1 if cell == X else 2 if cell == O else 0)
+    return index
+
+
+def table_entry(board):
+    """
+    Returns (utility under perfect play, optimal action) for a 3x3 board,
+    or None if the board cannot be reached in a game.
+    """
+    entry = TABLE[table_index(board)]
+    if not entry & 0x80:
+        return None
+    value = (entry >> 4 & 0x3) - 2
+    cell = entry & 0xF
+    return value, None if cell == 0xF else divmod(cell, 3)
+
+
+# Loaded once, None without a table to fall back on searching
+TABLE = load_table()
+
+# Progress of the last minimax call, with the work it did
+stats = None
+
+# Monte Carlo engine over the rules above, its tree kept between moves
+tree_search = mcts.MonteCarlo(player, actions, result, winner, terminal)
+
+
+def alpha_beta(state, alpha=-math.inf, beta=math.inf, progress=None,
+               depth=0):
     """
     Alpha Beta Pruning recursive helper function.
     """
 
+    # Report the work done, stop if no longer wanted
+    if progress is not None:
+        progress.nodes += 1
+        progress.max_depth = max(progress.max_depth, depth)
+        if progress.cancelled.is_set():
+            raise Cancelled()
+
     # Return value when terminal
     if terminal(state):
         return [utility(state), None]
 
+    # Look up the position, or any rotation or reflection of it
+    key, symmetry = canonical(state)
+    entry = transpositions.get(key)
+    best_action = None
+    if entry is not None:
+        value, bound, best_action = entry
+        best_action = transform(best_action, INVERSES[symmetry], state)
+
+        # Stored value is enough, or narrows the window
+        if progress is not None:
+            progress.tt_hits += 1
+        if bound == EXACT:
+            return [value, best_action]
+        if bound == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return [value, best_action]
+    window = (alpha, beta)
+
     # Create boolean variable to maximize or minimize
     maximize = True
     if player(state) == O:
@@ -196,12 +430,18 @@ def alpha_beta(state, alpha=-math.inf, beta=math.inf):
     if maximize:
         action_value = -math.inf
 
+    # Try the stored best move first, it often cuts the rest
+    ordered = list(actions(state))
+    if best_action is not None:
+        ordered.remove(best_action)
+        ordered.insert(0, best_action)
+
     # For possible actions on the board state -> get deeper state and handle it
-    for action in actions(state):
+    for action in ordered:
 
         # Run self with result of action and get value
         child = result(state, action)
-        child_value = alpha_beta(child, alpha, beta)[0]
+        child_value = alpha_beta(child, alpha, beta, progress, depth + 1)[0]
 
         # When Maximizing
         if maximize:
@@ -221,9 +461,59 @@ def alpha_beta(state, alpha=-math.inf, beta=math.inf):
                 action_value = child_value
                 optimal_action = action
 
+        # Show the best move found so far at the root
+        if depth == 0 and progress is not None:
+            progress.best_action = optimal_action
+
         # Cut unimportant tree
         if alpha >= beta:
+            if progress is not None:
+                progress.cutoffs += 1
             break
 
+    # Outside the searched window the value is only a bound
+    if action_value <= window[0]:
+        bound = UPPER
+    elif action_value >= window[1]:
+        bound = LOWER
+    else:
+        bound = EXACT
+    transpositions[key] = [
+        action_value, bound, transform(optimal_action, symmetry, state)
+    ]
+
     # Return value of action, and action
-    return [action_value, optimal_action]
\ No newline at end of file
+    return [action_value, optimal_action]
+
+
+def canonical(board):
+    """
+    Returns the key shared by a board and all its rotations and
+    reflections, and the index of the symmetry that turns the board
+    into the canonical board the key is made from.
+    """
+    r, c = len(board) - 1, len(board[0]) - 1
+    count = len(SYMMETRIES) if r == c else 4
+    best = None
+    for s in range(count):
+
+        # Cell (i, j) of the transformed board comes from inverse (i, j)
+        inverse = SYMMETRIES[INVERSES[s]]
+        key = "".join(
+            board[a][b] or "." for a, b in
+            (inverse(i, j, r, c) for i in range(r + 1) for j in range(c + 1))
+        )
+        if best is None or key < best[0]:
+            best = (key, s)
+    return best
+
+
+def transform(action, symmetry, board):
+    """
+    Returns the cell an action moves to under a symmetry.
+    """
+    if action is None:
+        return None
+    return SYMMETRIES[symmetry](
+        action[0], action[1], len(board) - 1, len(board[0]) - 1
+    )
\ No newline at end of file
@@ -1,8 +1,23 @@
-import itertools
+import weakref
+
+import sat
+
+# Most symbols to check by a truth table of every model, which then
+# takes 8 MB per symbol
+TABLE_SYMBOLS = 26
 
 
 class Sentence():
 
+    # Interned nodes (see intern) are shared and cannot change, so
+    # they alone cache their hash and symbols
+    __slots__ = ("_hash", "_symbols", "_interned", "__weakref__")
+
+    def __init__(self):
+        self._hash = None
+        self._symbols = None
+        self._interned = False
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
@@ -15,11 +30,56 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def operands(self):
+        """Returns the sentences the logical sentence is made of."""
+        return []
+
+    def python(self, bits):
+        """Returns a Python expression evaluating the logical sentence
+        in a model given as an integer, where symbol name is true if
+        bit bits[name] of it is set."""
+        raise Exception("nothing to compile")
+
+    def vectorize(self, columns, ones):
+        """Returns the column of the logical sentence in a truth table,
+        given the column of each symbol and the column true in every
+        model (see truth_table)."""
+        raise Exception("nothing to vectorize")
+
+    def compile(self, symbols=None):
+        """Returns a function evaluating the logical sentence in a model
+        given as an integer, with bit i set if symbols[i] is true."""
+        if symbols is None:
+            symbols = sorted(self.symbols())
+        bits = {name: i for i, name in enumerate(symbols)}
+        try:
+            return eval(f"lambda model: bool({self.python(bits)})")
+        except (SyntaxError, RecursionError, MemoryError):
+
+            # Too deeply nested for the parser, so evaluate it instead
+            return lambda model: self.evaluate(
+                {name: bool(model >> i & 1) for i, name in enumerate(symbols)}
+            )
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
             raise TypeError("must be a logical sentence")
 
+    @classmethod
+    def flatten(cls, sentence):
+        """Returns the operands of a sentence, with the operands of nested
+        sentences of its own type in their place."""
+        operands = []
+        stack = [sentence]
+        while stack:
+            node = stack.pop()
+            if type(node) is type(sentence):
+                stack.extend(reversed(node.operands()))
+            else:
+                operands.append(node)
+        return operands
+
     @classmethod
     def parenthesize(cls, s):
         """Parenthesizes an expression if not already parenthesized."""
@@ -43,8 +103,10 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
+        Sentence.__init__(self)
         self.name = name
 
     def __eq__(self, other):
@@ -68,16 +130,35 @@ class Symbol(Sentence):
     def symbols(self):
         return {self.name}
 
+    def python(self, bits):
+        try:
+            return f"(model & {1 << bits[self.name]})"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def vectorize(self, columns, ones):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
+        Sentence.__init__(self)
         Sentence.validate(operand)
         self.operand = operand
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and self.operand == other.operand
+        )
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("not", hash(self.operand)))
 
     def __repr__(self):
@@ -92,17 +173,33 @@ class Not(Sentence):
     def symbols(self):
         return self.operand.symbols()
 
+    def operands(self):
+        return [self.operand]
+
+    def python(self, bits):
+        return f"(not {self.operand.python(bits)})"
+
+    def vectorize(self, columns, ones):
+        return ~self.operand.vectorize(columns, ones)
+
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
+        Sentence.__init__(self)
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (
+            isinstance(other, And) and self.conjuncts == other.conjuncts
+        )
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
@@ -114,6 +211,8 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        if self._interned:
+            raise Exception("cannot add to an interned sentence")
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
 
@@ -127,19 +226,47 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        if self._symbols is not None:
+            return set(self._symbols)
+        return set().union(
+            *[conjunct.symbols() for conjunct in self.conjuncts]
+        )
+
+    def operands(self):
+        return self.conjuncts
+
+    def python(self, bits):
+        conjuncts = Sentence.flatten(self)
+        if not conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            [conjunct.python(bits) for conjunct in conjuncts]
+        ) + ")"
+
+    def vectorize(self, columns, ones):
+        column = ones
+        for conjunct in self.conjuncts:
+            column = column & conjunct.vectorize(columns, ones)
+        return column
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
+        Sentence.__init__(self)
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (
+            isinstance(other, Or) and self.disjuncts == other.disjuncts
+        )
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
@@ -158,22 +285,48 @@ class Or(Sentence):
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        if self._symbols is not None:
+            return set(self._symbols)
+        return set().union(
+            *[disjunct.symbols() for disjunct in self.disjuncts]
+        )
+
+    def operands(self):
+        return self.disjuncts
+
+    def python(self, bits):
+        disjuncts = Sentence.flatten(self)
+        if not disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            [disjunct.python(bits) for disjunct in disjuncts]
+        ) + ")"
+
+    def vectorize(self, columns, ones):
+        column = ~ones
+        for disjunct in self.disjuncts:
+            column = column | disjunct.vectorize(columns, ones)
+        return column
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
+        Sentence.__init__(self)
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
         self.antecedent = antecedent
         self.consequent = consequent
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (isinstance(other, Implication)
+                                 and self.antecedent == other.antecedent
+                                 and self.consequent == other.consequent)
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
     def __repr__(self):
@@ -189,22 +342,43 @@ class Implication(Sentence):
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        if self._symbols is not None:
+            return set(self._symbols)
+        return set().union(self.antecedent.symbols(),
+                           self.consequent.symbols())
+
+    def operands(self):
+        return [self.antecedent, self.consequent]
+
+    def python(self, bits):
+        antecedent = self.antecedent.python(bits)
+        consequent = self.consequent.python(bits)
+        return f"(not {antecedent} or {consequent})"
+
+    def vectorize(self, columns, ones):
+        antecedent = self.antecedent.vectorize(columns, ones)
+        consequent = self.consequent.vectorize(columns, ones)
+        return ~antecedent | consequent
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
+        Sentence.__init__(self)
         Sentence.validate(left)
         Sentence.validate(right)
         self.left = left
         self.right = right
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (isinstance(other, Biconditional)
+                                 and self.left == other.left
+                                 and self.right == other.right)
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
     def __repr__(self):
@@ -222,42 +396,211 @@ class Biconditional(Sentence):
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+        if self._symbols is not None:
+            return set(self._symbols)
+        return set().union(self.left.symbols(),
+                           self.right.symbols())
+
+    def operands(self):
+        return [self.left, self.right]
+
+    def python(self, bits):
+        left = self.left.python(bits)
+        right = self.right.python(bits)
+        return f"((not {left}) == (not {right}))"
+
+    def vectorize(self, columns, ones):
+        left = self.left.vectorize(columns, ones)
+        right = self.right.vectorize(columns, ones)
+        return ~(left ^ right)
+
+
+# Interned sentences by their class and name or interned operands,
+# forgotten once no longer used
+interned = weakref.WeakValueDictionary()
+
+
+def intern(sentence):
+    """Returns the shared, unchangeable sentence structurally equal to
+    sentence, so that equal subsentences are one object."""
+    if sentence._interned:
+        return sentence
+
+    # Operands are interned first, so equal ones are the same object
+    if isinstance(sentence, Symbol):
+        key = (Symbol, sentence.name)
+    else:
+        operands = [intern(operand) for operand in sentence.operands()]
+        key = (type(sentence),) + tuple(id(operand) for operand in operands)
+
+    node = interned.get(key)
+    if node is None:
+        if isinstance(sentence, Symbol):
+            node = Symbol(sentence.name)
+        else:
+            node = type(sentence)(*operands)
+        node._hash = hash(node)
+        node._symbols = frozenset(node.symbols())
+        node._interned = True
+        interned[key] = node
+    return node
 
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
-
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+
+    # Compile both to functions of a model, bit i for symbol i
+    knowledge = knowledge.compile(symbols)
+    query = query.compile(symbols)
+
+    # In every model where knowledge base is true, query must be true
+    for model in range(2 ** len(symbols)):
+        if knowledge(model) and not query(model):
+            return False
+    return True
+
+
+def model_check_all(knowledge, queries):
+    """Checks which of the queries knowledge base entails, in one pass
+    over the truth table of every model when NumPy is installed."""
+    symbols = sorted(set.union(knowledge.symbols(),
+                               *[query.symbols() for query in queries]))
+    if len(symbols) > TABLE_SYMBOLS:
+        return [sat_check(knowledge, query) for query in queries]
+
+    try:
+        import numpy
+    except ImportError:
+        return [model_check(knowledge, query) for query in queries]
+
+    # Entailed if no model makes knowledge true and query false
+    columns, ones = truth_table(symbols)
+    knowledge = knowledge.vectorize(columns, ones) & ones
+    return [not numpy.any(knowledge & ~query.vectorize(columns, ones))
+            for query in queries]
+
+
+def truth_table(symbols):
+    """Returns the column of each symbol in a truth table of every model,
+    and the column true in every model. Columns are NumPy arrays of 64
+    models to a word: model m, where symbols[i] is true if bit i of m is
+    set, is bit m % 64 of word m // 64."""
+    import numpy
+
+    words = max(1, 2 ** len(symbols) // 64)
+    index = numpy.arange(words, dtype=numpy.uint64)
+    full = numpy.uint64(2 ** 64 - 1)
+    columns = {}
+    for i, name in enumerate(symbols):
+
+        # Symbols of the first 6 bits alternate within every word,
+        # the others between whole words
+        if i < 6:
+            pattern = sum(1 << bit for bit in range(64) if bit >> i & 1)
+            columns[name] = numpy.full(words, pattern, dtype=numpy.uint64)
+        else:
+            columns[name] = (index >> numpy.uint64(i - 6) & 1) * full
+
+    # Fewer than 64 models leave the rest of the word unused
+    ones = numpy.full(words, full, dtype=numpy.uint64)
+    if len(symbols) < 6:
+        ones[0] = (1 << 2 ** len(symbols)) - 1
+    return columns, ones
+
+
+class Tseitin():
+    """Encodes sentences as clauses of integer literals (n for variable n
+    true, -n for false) for a clause-based prover, in size linear in the
+    sentences: every connective gets a variable equivalent to it."""
+
+    def __init__(self):
+        self.numbers = {}
+        self.literals = {}
+        self.clauses = []
+        self.count = 0
+
+    def variable(self):
+        """Returns a new variable."""
+        self.count += 1
+        return self.count
+
+    def add(self, sentence):
+        """Adds clauses that hold exactly when the sentence is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(disjunct)
+                                 for disjunct in sentence.disjuncts])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to a sentence, encoding every
+        structurally equal sentence only once."""
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        if isinstance(sentence, Symbol):
+            literal = self.numbers[sentence.name] = self.variable()
+        elif isinstance(sentence, And):
+            literal = self.connective(
+                [self.literal(conjunct) for conjunct in sentence.conjuncts],
+                True
+            )
+        elif isinstance(sentence, Or):
+            literal = self.connective(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts],
+                False
+            )
+        elif isinstance(sentence, Implication):
+            literal = self.connective([-self.literal(sentence.antecedent),
+                                       self.literal(sentence.consequent)],
+                                      False)
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            literal = self.variable()
+            self.clauses.extend([
+                [-literal, -left, right], [-literal, left, -right],
+                [literal, left, right], [literal, -left, -right]
+            ])
+        else:
+            raise Exception(f"cannot encode {sentence}")
+
+        self.literals[sentence] = literal
+        return literal
+
+    def connective(self, operands, conjunction):
+        """Returns a literal equivalent to the conjunction (or disjunction)
+        of literals."""
+        if len(operands) == 1:
+            return operands[0]
+
+        # A disjunction is the negated conjunction of negated operands
+        sign = 1 if conjunction else -1
+        literal = self.variable()
+        for operand in operands:
+            self.clauses.append([-literal, sign * operand])
+        self.clauses.append([literal] + [-sign * operand
+                                         for operand in operands])
+        return sign * literal
+
+    def model(self, assignment):
+        """Returns the model {name: bool} of a prover's assignment."""
+        return {name: assignment.get(number, False)
+                for name, number in self.numbers.items()}
+
+
+def sat_check(knowledge, query):
+    """Checks if knowledge base entails query, by finding that no model
+    makes knowledge true and query false."""
+    encoding = Tseitin()
+    encoding.add(knowledge)
+    encoding.add(Not(query))
+    return sat.satisfiable(encoding.clauses) is None
@@ -11,7 +11,7 @@ CKnave = Symbol("C is a Knave")
 
 # Puzzle 0
 # A says "I am both a knight and a knave."
-knowledge0 = And(
+knowledge0 = intern(And(
 
     # Can be Knight or Knave but not both
     Or(AKnight, AKnave),
@@ -20,12 +20,12 @@ knowledge0 = And(
     Implication(AKnight, And(AKnight, AKnave)),
     Implication(AKnave, Not(And(AKnight, AKnave)))
 
-)
+))
 
 # Puzzle 1
 # A says "We are both knaves."
 # B says nothing.
-knowledge1 = And(
+knowledge1 = intern(And(
 
     # A can be Knight or Knave but not both
     Or(AKnight, AKnave),
@@ -38,12 +38,12 @@ knowledge1 = And(
     Implication(AKnight, And(AKnave, BKnave)),
     Implication(AKnave, Not(And(AKnave, BKnave)))
 
-)
+))
 
 # Puzzle 2
 # A says "We are the same kind."
 # B says "We are of different kinds."
-knowledge2 = And(
+knowledge2 = intern(And(
 
     # A can be Knight or Knave but not both
     Or(AKnight, AKnave),
@@ -77,14 +77,14 @@ knowledge2 = And(
         And(AKnave, BKnight)
     )))
 
-)
+))
 
 # Puzzle 3
 # A says either "I am a knight." or "I am a knave.", but you don't know which.
 # B says "A said 'I am a knave'."
 # B says "C is a knave."
 # C says "A is a knight."
-knowledge3 = And(
+knowledge3 = intern(And(
 
     # A can be Knight or Knave but not both
     Or(AKnight, AKnave),
@@ -152,7 +152,7 @@ knowledge3 = And(
     Implication(CKnight, AKnight),
     Implication(CKnave, Not(AKnight))
 
-)
+))
 
 
 def main():
@@ -168,8 +168,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            entailed = model_check_all(knowledge, symbols)
+            for symbol, entails in zip(symbols, entailed):
+                if entails:
                     print(f"    {symbol}")
 
 
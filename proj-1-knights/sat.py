@@ -0,0 +1,230 @@
+"""
+Satisfiability solver for sentences in conjunctive normal form.
+
+Clauses are lists of nonzero integers, as in the DIMACS format: n
+stands for variable n being true and -n for it being false. The
+solver is DPLL with clause learning: pure literals are set first,
+unit clauses are propagated through two watched literals per clause,
+and every conflict adds a learned clause and jumps back to the
+decision that caused it.
+"""
+
+# Activities of variables in learned clauses decay by this factor,
+# so that recent conflicts decide which variable to branch on
+DECAY = 0.95
+
+
+def satisfiable(clauses):
+    """Returns a model {variable: bool} satisfying clauses, or None."""
+    return Solver(clauses).solve()
+
+
+class Solver():
+
+    def __init__(self, clauses):
+        self.variables = sorted({abs(literal)
+                                 for clause in clauses for literal in clause})
+        size = self.variables[-1] + 1 if self.variables else 1
+        self.values = [None] * size
+        self.levels = [0] * size
+        self.reasons = [None] * size
+        self.activity = [0.0] * size
+        self.phases = [False] * size
+        self.bump = 1.0
+
+        self.clauses = []
+        self.watches = {}
+        self.trail = []
+        self.decisions = []
+        self.head = 0
+        self.conflicting = False
+
+        # Drop repeated literals, and clauses always true
+        kept = []
+        for clause in clauses:
+            clause = list(dict.fromkeys(clause))
+            if any(-literal in clause for literal in clause):
+                continue
+            if not clause:
+                self.conflicting = True
+                continue
+            kept.append(clause)
+
+        for literal in self.pure_literals(kept):
+            self.assign(literal, None)
+        for clause in kept:
+            if any(self.value(literal) is True for literal in clause):
+                continue
+            self.add(clause)
+
+    def pure_literals(self, clauses):
+        """Returns literals whose negation is in no clause left unsatisfied."""
+        pure = []
+        remaining = clauses
+        while True:
+            literals = {literal for clause in remaining for literal in clause}
+            found = [literal for literal in literals
+                     if -literal not in literals]
+            if not found:
+                return pure
+            pure.extend(found)
+            found = set(found)
+            remaining = [clause for clause in remaining
+                         if not found.intersection(clause)]
+
+    def add(self, clause):
+        """Adds a clause, watching its first two literals."""
+        if len(clause) == 1:
+            if self.value(clause[0]) is False:
+                self.conflicting = True
+            elif self.value(clause[0]) is None:
+                self.assign(clause[0], None)
+            return None
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches.setdefault(clause[0], []).append(index)
+        self.watches.setdefault(clause[1], []).append(index)
+        return index
+
+    def value(self, literal):
+        """Returns the truth of a literal, or None if it is unassigned."""
+        value = self.values[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def assign(self, literal, reason):
+        """Makes a literal true at the current level, implied by a clause."""
+        variable = abs(literal)
+        self.values[variable] = literal > 0
+        self.levels[variable] = len(self.decisions)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """Assigns the literals of unit clauses, returns any conflict."""
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = self.watches.get(false, [])
+            i = 0
+            while i < len(watching):
+                index = watching[i]
+                clause = self.clauses[index]
+
+                # Keep the literal that became false second
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) is True:
+                    i += 1
+                    continue
+
+                # Watch another literal that is not false, if any
+                for j in range(2, len(clause)):
+                    if self.value(clause[j]) is not False:
+                        clause[1], clause[j] = clause[j], clause[1]
+                        self.watches.setdefault(clause[1], []).append(index)
+                        watching[i] = watching[-1]
+                        watching.pop()
+                        break
+                else:
+                    if self.value(clause[0]) is False:
+                        return index
+                    self.assign(clause[0], index)
+                    i += 1
+        return None
+
+    def analyze(self, conflict):
+        """Returns the learned clause and the level to jump back to."""
+        level = len(self.decisions)
+        learned = [None]
+        seen = set()
+        count = 0
+        position = len(self.trail) - 1
+        index = conflict
+        while True:
+            for literal in self.clauses[index]:
+                variable = abs(literal)
+                if variable in seen or self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.increase(variable)
+                if self.levels[variable] == level:
+                    count += 1
+                else:
+                    learned.append(literal)
+
+            # Resolve with the reason of the latest literal involved,
+            # until one literal of this level is left
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            count -= 1
+            if count == 0:
+                break
+            index = self.reasons[abs(literal)]
+        learned[0] = -literal
+
+        # Watch the literal of the highest level after the asserted one
+        jump = 0
+        for i in range(1, len(learned)):
+            if self.levels[abs(learned[i])] > jump:
+                jump = self.levels[abs(learned[i])]
+                learned[1], learned[i] = learned[i], learned[1]
+        self.bump /= DECAY
+        return learned, jump
+
+    def increase(self, variable):
+        """Bumps the activity of a variable, rescaling all if too large."""
+        self.activity[variable] += self.bump
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.bump *= 1e-100
+
+    def backtrack(self, level):
+        """Unassigns every literal above a decision level."""
+        if len(self.decisions) <= level:
+            return
+        for literal in self.trail[self.decisions[level]:]:
+            variable = abs(literal)
+            self.phases[variable] = self.values[variable]
+            self.values[variable] = None
+            self.reasons[variable] = None
+        del self.trail[self.decisions[level]:]
+        del self.decisions[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the unassigned variable of highest activity, or None."""
+        best = None
+        for variable in self.variables:
+            if self.values[variable] is None and (
+                best is None or self.activity[variable] > self.activity[best]
+            ):
+                best = variable
+        return best
+
+    def solve(self):
+        """Returns a model {variable: bool} satisfying the clauses, or None."""
+        if self.conflicting:
+            return None
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.decisions:
+                    return None
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                index = self.add(learned)
+                if index is not None:
+                    self.assign(learned[0], index)
+                continue
+
+            variable = self.decide()
+            if variable is None:
+                return {variable: bool(self.values[variable])
+                        for variable in self.variables}
+            self.decisions.append(len(self.trail))
+            self.assign(variable if self.phases[variable] else -variable,
+                        None)